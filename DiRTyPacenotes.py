@@ -20,260 +20,58 @@
 import csv
 import glob
 import os
-import socket
-import struct
 import sys
 import itertools
+import multiprocessing
 import ast
-import math
-import win32gui, win32con
+from threading import Thread
+from startup import StartupReport  # Before the slow imports, its clock starts on import.
+try:
+    import win32gui, win32con
+except ImportError:  # Not on Windows, there is no console to hide.
+    win32gui = None
 import wx
-import wx.adv
 import wx.aui
 import wx.grid
 import wx.lib.intctrl as ict
-import wx.lib.scrolledpanel as scr
 import wx.lib.agw.ultimatelistctrl as ulc
-import wx.lib.agw.flatnotebook as fnb
 import wx.lib.agw.persist as per
-from wx.lib.wordwrap import wordwrap
 from pubsub import pub
-from collections import defaultdict, OrderedDict
+from collections import defaultdict
 from configobj import ConfigObj
-from threading import Thread
-from queue import Queue
-from pydub import AudioSegment
-from pydub.playback import play
-from pathlib import Path
+from bridge import UIBridge
+from control import ControlChannel, QUIT, DELAY, VOLUME, PACENOTES
+from document import PacenoteDocument, INSERTED, DELETED, UPDATED, TICKED
+from saving import StageWriter, SET, DELETE, recover
+from stages import StageIndex
+from triggers import HighlightCursor
 
 
-hide = win32gui.GetForegroundWindow()
-win32gui.ShowWindow(hide, win32con.SW_HIDE)
-
 app_path = os.getcwd()
 data_path = os.path.join(app_path, 'data')
 img_path = os.path.join(data_path, 'images')
 config_ini = os.path.join(data_path, 'config.ini')
-sound_bank = {}
-q_snd = Queue()
-q_run = Queue()
-q_rst = Queue()
-q_del = Queue()
-q_vol = Queue()
-q_dic = Queue()
-q_cfg = Queue()
-q_stg = Queue()
-
-
-# UDP server
-class Reader(Thread):
-    def __init__(self):
-        Thread.__init__(self)
-
-        if not q_cfg.empty():
-            config = q_cfg.get_nowait()
-            q_cfg.task_done()
-            self.server = config[0]
-            self.co_driver = config[1]
-            self.delay = config[2]
-            self.volume = config[3]
-            self.countdown = config[4]
-        co_path = os.path.join(app_path, 'co-drivers', self.co_driver)
-        self.pace_path = os.path.join(co_path, 'pacenotes')
-        self.snd_path = os.path.join(co_path, 'sounds')
-        if not q_stg.empty():
-            self.dic_stages = q_stg.get_nowait()
-            q_stg.task_done()
-        self.dic_pacenotes = OrderedDict()
-        self.dic_new_pacenotes = OrderedDict()
-        self.new_dist = 0
-        self.pos_y = 0
-        self.total_laps = 0
-        self.lap_time = 0
-        self.stage_length = 0
-        self.snd_ext = ''
-        self.stage_path = ''
-        self.stage_name = ''
-        self.stage_name_dic = ''
-        self.stage_folder = ''
-        self.stage_file = ''
-        self.count_played = False
-        self.restart = False
-
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.sock.bind(self.server)
-
-        self.running = True
-        self.setDaemon(True)
-        self.start()
+control = ControlChannel()
+report = StartupReport()
+report.mark('imports')
 
-    def run(self):
-        try:
-            snd_file_list = q_snd.get_nowait()
-            loaded = 0
-            for snd_file in snd_file_list:
-                sound = Path(snd_file).stem
-                snd, self.snd_ext = os.path.splitext(snd_file)
-                try:
-                    sound_bank[sound] = AudioSegment.from_file(snd_file)
-                except IndexError:
-                    continue
-                loaded += 1
-                wx.CallAfter(pub.sendMessage, 'get_progress', arg=loaded)
-        except IOError:
-            pass
 
-        while self.running:
-            self.receive_udp_packet()  # Has its own breakable while loop.
-            self.detect_stage()
-            self.read_pacenotes_file()
-            self.receive_udp_stream()  # Has its own infinite while loop.
-        self.sock.shutdown(socket.SHUT_RD)
-        self.sock.close()
-
-    # Perform initial UDP detection.
-    def receive_udp_packet(self):
-        while True:
-            udp_stream = self.sock.recv(512)
-            if not udp_stream:
-                break  # lost connection
-            udp_data = struct.unpack('64f', udp_stream[0:256])
-            total_time = int(udp_data[0])
-            self.pos_y = int(udp_data[5])
-            curr_lap = int(udp_data[59])
-            self.total_laps = int(udp_data[60])
-            self.stage_length = round(udp_data[61], 4)
-
-            # wx.CallAfter(pub.sendMessage, 'get_stage_length', arg=self.stage_length)
-            if total_time == 0 != curr_lap:  # Wait for udp from next stage after finish.
-                continue
-            break
-
-    # Detect stage.
-    def detect_stage(self):
-        for k, v in list(self.dic_stages.items()):
-            if self.stage_length == k and self.total_laps == 1:  # Rally stage indicator.
-                for s in v:
-                    if len(v) == 1:
-                        stg = s.split(',')
-                        self.stage_name_dic = stg[1]
-                        self.stage_folder = stg[2]
-                    elif len(v) == 2:
-                        stg = s.split(',')
-                        pos_start = int(stg[0])
-                        if self.pos_y == pos_start:
-                            self.stage_name_dic = stg[1]
-                            self.stage_folder = stg[2]
-        if self.stage_name_dic != self.stage_name:
-            self.stage_name = self.stage_name_dic
-            self.stage_path = os.path.join(self.pace_path, self.stage_folder)
-            self.stage_file = os.path.join(self.stage_path, self.stage_name + '.txt')
-            wx.CallAfter(pub.sendMessage, 'get_stage', arg1=self.stage_name, arg2=self.stage_path)
-
-    # Read pacenotes file.
-    def read_pacenotes_file(self):
-        self.dic_pacenotes.clear()
-        with open(self.stage_file, 'r') as f:
-            for line in f:
-                if line and line.strip():
-                    lis = line.split(',')  # list [curr_dist, sound]
-                    key = int(lis[0])  # key as integer
-                    val = lis[1].strip()  # value as string
-                    self.dic_pacenotes[key] = []  # empty list
-                    self.dic_pacenotes[key].append(val)  # dictionary
-                else:
-                    continue  # skip empty lines
+# Dialogs, taskbar icon and about box with their wx modules, imported on first use.
+def dialogs():
+    return report.load('dialogs')
 
-    # Receive UDP stream.
-    def receive_udp_stream(self):
-        last_dist = -20
-        last_time = 0
 
-        # Play countdown sound.
-        try:
-            if self.countdown and not self.count_played and last_time == 0:
-                sound_count = sound_bank['countdown_start'] + self.volume
-                play(sound_count)
-                self.count_played = True
-        except KeyError:
-            wx.CallAfter(pub.sendMessage, 'key_error', arg='countdown_start')
-            return
-
-        while self.running:
-            if not q_run.empty():
-                self.running = q_run.get_nowait()
-                q_run.task_done()
-            if not q_rst.empty():
-                reset = q_rst.get_nowait()
-                q_rst.task_done()
-                if reset is True:
-                    return
-            if not q_del.empty():
-                self.delay = q_del.get_nowait()
-                q_del.task_done()
-            if not q_vol.empty():
-                self.volume = q_vol.get_nowait()
-                q_vol.task_done()
-            if not q_dic.empty():
-                self.dic_pacenotes.clear()
-                dic_pace = q_dic.get_nowait()
-                q_dic.task_done()
-                for key, val in list(dic_pace.items()):
-                    self.dic_pacenotes[int(key)] = []
-                    self.dic_pacenotes[int(key)].append(val.strip())
-            udp_stream = self.sock.recv(512)
-            if not udp_stream:
-                break  # lost connection
-            udp_data = struct.unpack('64f', udp_stream[0:256])
-            total_time = udp_data[0]
-            lap_time = int(udp_data[1])
-            curr_dist = int(udp_data[2])
-            curr_lap = int(udp_data[59])
-
-            if total_time == last_time and lap_time == 0:
-                self.restart = True
-            else:
-                self.restart = False
-            wx.CallAfter(pub.sendMessage, 'get_pause', arg=self.restart)
-
-            # Play sounds.
-            if lap_time > 0:  # Timing clock started.
-                self.count_played = False
-                if curr_lap == 0:  # Car on stage but before finish line.
-                    wx.CallAfter(pub.sendMessage, 'get_dist', arg1=curr_dist, arg2=last_dist)
-                    self.dic_new_pacenotes.clear()
-                    for dist, pace in list(self.dic_pacenotes.items()):
-                        if curr_dist < self.delay:
-                            self.new_dist = math.ceil(dist / 2)
-                        elif curr_dist >= self.delay:
-                            self.new_dist = dist - self.delay
-                        self.dic_new_pacenotes[self.new_dist] = pace
-                    for new_dist, new_pace in list(self.dic_new_pacenotes.items()):
-                        if curr_dist == new_dist:
-                            if curr_dist > last_dist:  # Play pacenotes.
-                                for curr_pace in new_pace:
-                                    snd = curr_pace.split()
-                                    for sound_name in snd:
-                                        try:
-                                            sound_pace = sound_bank[sound_name] + self.volume
-                                            play(sound_pace)
-                                        except KeyError:
-                                            wx.CallAfter(pub.sendMessage, 'key_error', arg=sound_name)
-                                            pass
-                            elif 0 < curr_dist < last_dist:  # Play wrong_way.
-                                try:
-                                    sound_wrong = sound_bank['wrong_way'] + self.volume
-                                    play(sound_wrong)
-                                except KeyError:
-                                    wx.CallAfter(pub.sendMessage, 'key_error', arg='wrong_way')
-                                    pass
-                elif curr_lap == 1:  # Stage is finished.
-                    break
-                last_dist = curr_dist
-            elif lap_time == 0:  # Timing clock not started.
-                break
-            last_time = total_time
+# Sound categories from sounds.csv, {category: [sound]}.
+def read_sound_list(sounds_csv):
+    sound_list = defaultdict(list)
+    with open(sounds_csv, 'r') as csv_file:
+        csv_data = csv.DictReader(csv_file)
+        for row in csv_data:
+            pair = list(row.items())  # list of tuples of (key, value) pairs
+            for key, value in pair:
+                if value:
+                    sound_list[key].append(value)  # dict with multiple values for same keys
+    return sound_list
 
 
 class MenuBar(wx.MenuBar):
@@ -380,238 +178,101 @@ class MenuBar(wx.MenuBar):
         self.Bind(wx.EVT_MENU, self.parent.on_about, self.menu_about)
 
 
-class TaskBar(wx.adv.TaskBarIcon):
-    def __init__(self, frame):
-        wx.adv.TaskBarIcon.__init__(self)
-
-        self.frame = frame
-        self.SetIcon(frame.icon, frame.title)
-        self.Bind(wx.EVT_MENU, self.on_show, id=1)
-        self.Bind(wx.EVT_MENU, self.on_hide, id=2)
-        self.Bind(wx.EVT_MENU, self.on_close, id=3)
-
-    def CreatePopupMenu(self):
-        menu = wx.Menu()
-        menu.Append(1, 'Show')
-        menu.Append(2, 'Hide')
-        menu.Append(3, 'Close')
-        return menu
-
-    def on_show(self, event):
-        if not self.frame.IsShown():
-            self.frame.Show()
+# Pacenote rows drawn on demand from the document, columns tick, distance and pacenote
+class PacenoteTable(wx.grid.GridTableBase):
+    TICK, DIST, PACE = range(3)
 
-    def on_hide(self, event):
-        if self.frame.IsShown():
-            self.frame.Hide()
-
-    def on_close(self, event):
-        self.frame.Close()
-
-
-class HandInput(wx.Dialog):  # not used at the moment
-    def __init__(self, parent):
-        wx.Dialog.__init__(self, parent)
+    def __init__(self, parent, document):
+        wx.grid.GridTableBase.__init__(self)
 
         self.parent = parent
-        self.SetSize(wx.Size(180, 80))
-        self.SetTitle('DiRTy Handbrake')
-        self.SetIcon(self.parent.icon)
-        self.Center(wx.BOTH)
-
-        panel = wx.Panel(self, name='panel_handbrake')
-        box_main = wx.BoxSizer(wx.HORIZONTAL)
-
-        label_handbrake = wx.StaticText(panel, 0, 'APPLY HANDBRAKE')
-        box_main.Add(label_handbrake, 0, wx.ALIGN_CENTER_HORIZONTAL | wx.ALL, 15)
-        panel.SetSizer(box_main)
-
-        # self.SetReturnCode()
-
-
-class TextDropTarget(wx.TextDropTarget):
-    def __init__(self, target):
-        wx.TextDropTarget.__init__(self)
-        self.target = target
-
-    def OnDropText(self, x, y, data):
-        self.target.InsertItem(sys.maxsize, data)
-        return True
-
-
-class Settings(wx.Dialog):
-    def __init__(self, parent):
-        wx.Dialog.__init__(self, parent)
-
-        self.parent = parent
-        self.SetSize(wx.Size(260, 340))
-        self.SetTitle('DiRTy Pacenotes - Service Area')
-        self.SetIcon(self.parent.icon)
-        self.Center(wx.BOTH)
-
-        panel = wx.Panel(self, name='panel_settings')
-        box_main = wx.BoxSizer(wx.VERTICAL)
-
-        box_server = wx.StaticBox(panel, 0, 'UDP SERVER')
-        sbs_server = wx.StaticBoxSizer(box_server)
-
-        label_ip = wx.StaticText(panel, 0, 'IP')
-        self.ip_value = wx.TextCtrl(panel, size=wx.Size(60, 23))
-        self.ip_value.SetValue(self.parent.ip)
-        sbs_server.Add(label_ip, 0, wx.ALIGN_CENTER_VERTICAL | wx.LEFT, 10)
-        sbs_server.Add(self.ip_value, 0, wx.ALL, 10)
-        label_port = wx.StaticText(panel, 0, 'Port')
-        self.port_value = ict.IntCtrl(panel, size=wx.Size(45, 23), min=10000, max=99999, value=self.parent.port,
-                                      limited=True, allow_none=True)
-        self.port_value.SetValue(self.parent.port)
-        sbs_server.Add(label_port, 0, wx.ALIGN_CENTER_VERTICAL)
-        sbs_server.Add(self.port_value, 0, wx.ALL, 10)
-
-        box_co_driver = wx.StaticBox(panel, 0, 'CO-DRIVER')
-        sbs_co_driver = wx.StaticBoxSizer(box_co_driver)
-
-        co_drivers = os.listdir('co-drivers')
-        self.combo_co_driver = wx.ComboBox(panel, choices=co_drivers, style=wx.CB_READONLY)
-        self.combo_co_driver.SetValue(self.parent.co_driver)
-        self.combo_co_driver.SetFocus()
-        sbs_co_driver.Add(self.combo_co_driver, 0, wx.ALL, 10)
-
-        box_countdown = wx.BoxSizer(wx.HORIZONTAL)
-        self.count_check = wx.CheckBox(panel, 0, 'COUNTDOWN')
-        self.count_check.SetValue(bool(self.parent.countdown))
-        box_countdown.Add(self.count_check, 0, wx.ALL, 10)
-
-        '''
-        box_handbrake = wx.StaticBox(panel, 0, 'HANDBRAKE')
-        sbs_handbrake = wx.StaticBoxSizer(box_handbrake)
-
-        button_handbrake = wx.Button(panel, wx.ID_ANY, 'CHANGE')
-        button_handbrake.Bind(wx.EVT_BUTTON, self.parent.on_change_handbrake)
-        self.handbrake_value = wx.TextCtrl(panel, size=wx.Size(60, 23))
-        self.handbrake_value.SetValue(self.parent.handbrake)
-        sbs_handbrake.Add(self.handbrake_value, 0, wx.ALL, 10)
-        sbs_handbrake.Add(button_handbrake, 0, wx.ALIGN_CENTER_VERTICAL | wx.LEFT, 10)
-        '''
-        bs_buttons = wx.BoxSizer(wx.HORIZONTAL)
-        button_reload = wx.Button(panel, id=2, label='SAVE and RELOAD')
-        button_reload.Bind(wx.EVT_BUTTON, self.parent.on_reload)
-
-        bs_buttons.Add(button_reload, 0)
-
-        box_main.Add(sbs_server, 0, wx.ALL, 20)
-        box_main.Add(sbs_co_driver, 0, wx.LEFT, 20)
-        box_main.Add(box_countdown, 0, wx.LEFT, 20)
-        # box_main.Add(sbs_handbrake, 0, wx.LEFT | wx.RIGHT, 20)
-        box_main.Add(bs_buttons, 0, wx.ALIGN_CENTER_HORIZONTAL | wx.TOP, 20)
-        panel.SetSizer(box_main)
-
-
-class Creator(wx.Dialog):
-    def __init__(self, parent):
-        wx.Dialog.__init__(self, parent)
-
-        self.parent = parent
-        self.SetSize(wx.Size(640, 480))
-        self.SetTitle('DiRTy Pacenotes - ' + self.parent.co_driver)
-        self.SetBackgroundColour('light grey')
-        self.SetIcon(self.parent.icon)
-        self.Center(wx.BOTH)
-        self.SetWindowStyle(wx.DEFAULT_DIALOG_STYLE)
-
-        self.dict_list_c = {}
-        self.cat_list_c = []
-        self.sound_list_c = []
-        self.audio_list_c = []
-        self.selection_left = []
-        self.selection_right = []
-
-        panel_sizer = wx.BoxSizer(wx.HORIZONTAL)
-
-        # Left side
-        box_left = wx.BoxSizer(wx.HORIZONTAL)
-        self.tabs_left = fnb.FlatNotebook(self, agwStyle=fnb.FNB_HIDE_ON_SINGLE_TAB)
-        box_left.Add(self.tabs_left, 1, wx.EXPAND)
-
-        # Right side
-        box_right = wx.BoxSizer(wx.VERTICAL)
-
-        # Panel with buttons (right top)
-        box_but_top = wx.BoxSizer(wx.HORIZONTAL)
-        box_but_bot = wx.BoxSizer(wx.HORIZONTAL)
-
-        self.button_in = wx.Button(self, wx.ID_ANY, label=u'IN')
-        self.button_out = wx.Button(self, wx.ID_ANY, label=u'OUT')
-        button_add = wx.Button(self, wx.ID_ANY, label='ADD CATEGORY')
-        button_reload = wx.Button(self, id=1, label='SAVE and RELOAD')
-        button_reset = wx.Button(self, wx.ID_ANY, label='RESET SOUNDS')
-
-        self.button_in.Disable()
-        self.button_out.Disable()
-
-        box_but_top.Add(self.button_in, 0, wx.ALL, 5)
-        box_but_top.Add(self.button_out, 0, wx.ALL, 5)
-        box_but_top.Add(button_add, 0, wx.ALL, 5)
-        box_but_bot.Add(button_reset, 0, wx.ALL, 5)
-        box_but_bot.Add(button_reload, 0, wx.ALL, 5)
-
-        self.button_in.Bind(wx.EVT_BUTTON, self.parent.sounds_in)
-        self.button_out.Bind(wx.EVT_BUTTON, self.parent.sounds_out)
-        button_reset.Bind(wx.EVT_BUTTON, self.parent.reset_sounds)
-        button_reload.Bind(wx.EVT_BUTTON, self.parent.on_reload)
-        button_add.Bind(wx.EVT_BUTTON, self.parent.add_category)
-
-        # Panel with categories (right bottom)
-        box_cat = wx.BoxSizer(wx.HORIZONTAL)
-        self.tabs_right = wx.aui.AuiNotebook(self, style=wx.aui.AUI_NB_WINDOWLIST_BUTTON | wx.aui.AUI_NB_TAB_MOVE |
-                                             wx.aui.AUI_NB_SCROLL_BUTTONS | wx.aui.AUI_NB_CLOSE_BUTTON)
-        self.tabs_right.Bind(wx.aui.EVT_AUINOTEBOOK_PAGE_CLOSE, self.parent.on_tab_close)
-        box_cat.Add(self.tabs_right, 1, wx.EXPAND)
-
-        box_right.Add(box_but_top, 0, wx.ALIGN_CENTER_HORIZONTAL)
-        box_right.Add(box_cat, 2, wx.EXPAND | wx.ALL, 5)
-        box_right.Add(box_but_bot, 0, wx.ALIGN_CENTER_HORIZONTAL)
-
-        # Add sizers to panel_sizer.
-        panel_sizer.Add(box_left, 1, wx.EXPAND | wx.ALL, 10)
-        panel_sizer.Add(box_right, 0, wx.EXPAND | wx.ALL, 10)
-        self.SetSizer(panel_sizer)
-
-        self.create_audio()
-        self.create_sounds()
-
-    # Define methods.
-    def create_audio(self):
-        self.tabs_left.DeleteAllPages()
-        for s in os.listdir(self.parent.sound_path):
-            (name, ext) = s.split('.')
-            self.audio_list_c.append(name)
-        for sublist in list(self.parent.sound_list.values()):
-            for item in sublist:
-                self.sound_list_c.append(item)
-        audio_list_final = self.parent.diff(self.audio_list_c, self.sound_list_c)
-        audio_list_final.sort()
-        tab_left = wx.Panel(self.tabs_left, style=wx.BORDER_NONE, id=1)
-        tab_left.SetBackgroundColour('white')
-        tab_left.SetCursor(wx.Cursor(wx.CURSOR_HAND))
-        list_box_left = wx.ListBox(tab_left, choices=audio_list_final, style=wx.LB_MULTIPLE)
-        h_box_tabs = wx.BoxSizer(wx.HORIZONTAL)
-        h_box_tabs.Add(list_box_left, 0, wx.EXPAND)
-        tab_left.SetSizer(h_box_tabs)
-        list_box_left.Bind(wx.EVT_LISTBOX, self.parent.on_listbox_left)
-        self.tabs_left.AddPage(tab_left, 'audio')
-
-    def create_sounds(self):
-        self.tabs_right.DeleteAllPages()
-        for category, sounds_list in list(self.parent.sound_list.items()):
-            tab_right = wx.Panel(self.tabs_right, style=wx.TAB_TRAVERSAL | wx.BORDER_NONE, name=category, id=2)
-            tab_right.SetBackgroundColour('white')
-            tab_right.SetCursor(wx.Cursor(wx.CURSOR_HAND))
-            list_box_right = wx.ListBox(tab_right, choices=sounds_list, style=wx.LB_MULTIPLE)
-            h_box_tabs = wx.BoxSizer(wx.HORIZONTAL)
-            h_box_tabs.Add(list_box_right, 0, wx.EXPAND)
-            tab_right.SetSizer(h_box_tabs)
-            list_box_right.Bind(wx.EVT_LISTBOX, self.parent.on_listbox_right)
-            self.tabs_right.AddPage(tab_right, category)
+        self.document = document
+        self.rows = 0  # Rows the grid knows of.
+        self.bold = None  # Distance of the highlighted row.
+        self.attrs = {}
+        for col in (self.TICK, self.DIST, self.PACE):
+            attr = wx.grid.GridCellAttr()
+            attr.SetFont(parent.font)
+            self.attrs[col] = attr
+        self.attrs[self.TICK].SetAlignment(wx.ALIGN_CENTER, wx.ALIGN_CENTER)
+        self.attr_bold = self.attrs[self.PACE].Clone()
+        self.attr_bold.SetFont(parent.font.Bold())
+        document.subscribe(self.on_changes)
+
+    def GetNumberRows(self):
+        return len(self.document)
+
+    def GetNumberCols(self):
+        return 3
+
+    def GetTypeName(self, row, col):
+        if col == self.TICK:
+            return wx.grid.GRID_VALUE_BOOL
+        if col == self.DIST:
+            return wx.grid.GRID_VALUE_NUMBER + ':1,19999'
+        return wx.grid.GRID_VALUE_STRING
+
+    def GetValue(self, row, col):
+        key = self.document.dist_at(row)
+        if col == self.TICK:
+            return key in self.document.ticked
+        if col == self.DIST:
+            return key
+        return self.document[key]
+
+    def SetValue(self, row, col, value):
+        key = self.document.dist_at(row)
+        if col == self.TICK:
+            self.parent.tick_row(key, bool(value))
+        elif col == self.DIST and int(value) != key:
+            wx.CallAfter(self.parent.move_pacenote, key, int(value))  # Rows change, not while editing.
+
+    def GetAttr(self, row, col, kind):
+        attr = self.attr_bold if col == self.PACE and self.document.dist_at(row) == self.bold else self.attrs[col]
+        attr.IncRef()
+        return attr
+
+    def row(self, key):
+        return self.document.index(key)
+
+    # Tell the grid about the rows a document edit touched, only those are redrawn.
+    def on_changes(self, changes):
+        grid = self.GetView()
+        if grid is None:
+            return
+        grid.BeginBatch()
+        for change in changes:
+            if change.kind == INSERTED:
+                self.notify(wx.grid.GRIDTABLE_NOTIFY_ROWS_INSERTED, change.row, 1)
+                self.rows += 1
+            elif change.kind == DELETED:
+                self.notify(wx.grid.GRIDTABLE_NOTIFY_ROWS_DELETED, change.row, 1)
+                self.rows -= 1
+            elif change.kind in (UPDATED, TICKED):
+                self.refresh(change.row)
+            else:
+                self.reset()
+        grid.EndBatch()
+
+    def notify(self, message, *args):
+        self.GetView().ProcessTableMessage(wx.grid.GridTableMessage(self, message, *args))
+
+    def refresh(self, row):
+        if 0 <= row < self.rows:
+            grid = self.GetView()
+            rect = grid.BlockToDeviceRect(wx.grid.GridCellCoords(row, 0), wx.grid.GridCellCoords(row, self.PACE))
+            grid.GetGridWindow().RefreshRect(rect)
+
+    # All rows again, in O(n) without creating any widgets.
+    def reset(self):
+        rows = len(self.document)
+        if rows < self.rows:
+            self.notify(wx.grid.GRIDTABLE_NOTIFY_ROWS_DELETED, rows, self.rows - rows)
+        elif rows > self.rows:
+            self.notify(wx.grid.GRIDTABLE_NOTIFY_ROWS_APPENDED, rows - self.rows)
+        self.rows = rows
+        self.notify(wx.grid.GRIDTABLE_REQUEST_VIEW_GET_VALUES)
+        self.GetView().ForceRefresh()
 
 
 class Editor(wx.Window):
@@ -622,17 +283,26 @@ class Editor(wx.Window):
         self.SetBackgroundColour('white')
         self.SetWindowStyle(wx.BORDER_THEME)
 
-        # SCROLLED PANEL #
-        self.scrolled_panel = scr.ScrolledPanel(self, style=wx.BORDER_NONE)
-        self.scrolled_panel.SetupScrolling(scroll_x=False, rate_y=8, scrollToTop=False)
-        self.scrolled_panel.SetBackgroundColour('white')
-        self.scrolled_panel.SetAutoLayout(1)
-
-        logo = wx.StaticBitmap(self.scrolled_panel)
-        logo.SetBitmap(wx.Bitmap(os.path.join(img_path, 'logo.png')))
-
-        self.v_box = wx.BoxSizer(wx.VERTICAL)
-        self.scrolled_panel.SetSizer(self.v_box)
+        # PACENOTES GRID #
+        self.logo = wx.StaticBitmap(self)
+        self.logo.SetBitmap(wx.Bitmap(os.path.join(img_path, 'logo.png')))
+
+        self.grid = wx.grid.Grid(self, style=wx.BORDER_NONE)
+        self.table = PacenoteTable(self.parent, self.parent.document)
+        self.grid.SetTable(self.table, True, wx.grid.Grid.SelectCells)
+        self.grid.HideRowLabels()
+        self.grid.HideColLabels()
+        self.grid.DisableDragRowSize()
+        self.grid.SetDefaultRowSize(24, True)
+        self.grid.SetColSize(PacenoteTable.TICK, 22)
+        self.grid.SetColSize(PacenoteTable.DIST, 50)
+        self.grid.SetColMinimalAcceptableWidth(22)
+        self.grid.SetGridLineColour('white')
+        self.grid.SetScrollRate(0, 8)
+        self.grid.Hide()
+        self.grid.Bind(wx.EVT_SIZE, self.on_size)
+        self.grid.Bind(wx.grid.EVT_GRID_EDITOR_CREATED, self.parent.on_editor_created)
+        self.grid.Bind(wx.grid.EVT_GRID_EDITOR_SHOWN, self.parent.on_editor_shown)
 
         # BUTTONS #
         self.button_add = wx.Button(self, label='ADD')
@@ -725,7 +395,8 @@ class Editor(wx.Window):
 
         # Add sizers to panel_sizer.
         panel_sizer = wx.BoxSizer(wx.VERTICAL)
-        panel_sizer.Add(self.scrolled_panel, 1, wx.EXPAND | wx.ALL, 10)
+        panel_sizer.Add(self.logo, 1, wx.EXPAND | wx.ALL, 10)
+        panel_sizer.Add(self.grid, 1, wx.EXPAND | wx.ALL, 10)
         panel_sizer.AddSpacer(5)
         panel_sizer.Add(self.h_box_buttons, 0, wx.EXPAND | wx.ALIGN_LEFT | wx.LEFT, 20)
         panel_sizer.AddSpacer(5)
@@ -737,6 +408,21 @@ class Editor(wx.Window):
 
         self.SetSizer(panel_sizer)
 
+    def on_size(self, event):  # Pacenote column takes the remaining width.
+        width = self.grid.GetClientSize().width - self.grid.GetColSize(0) - self.grid.GetColSize(1)
+        self.grid.SetColSize(PacenoteTable.PACE, max(width, 50))
+        event.Skip()
+
+    def show_grid(self):
+        if not self.grid.IsShown():
+            self.logo.Hide()
+            self.grid.Show()
+            self.Layout()
+
+    # Restyle one row and redraw only its cells.
+    def refresh_row(self, key):
+        self.table.refresh(self.table.row(key))
+
 
 class DiRTyPacenotes(wx.Frame):
     def __init__(self, *args, **kwargs):
@@ -761,23 +447,38 @@ class DiRTyPacenotes(wx.Frame):
         self.volume = int(config['volume'])
         self.countdown = ast.literal_eval(config['countdown'])
         self.handbrake = config['handbrake']
+        self.drain = ast.literal_eval(config.get('drain', 'False'))
+        self.backend = config.get('backend', 'thread')
+        self.record = config.get('record', '')
+        self.stage_tolerance = float(config.get('stage_tolerance', '0.01'))
+        self.phrase_cache_mb = int(config.get('phrase_cache_mb', '64'))
+        self.sound_bank = config.get('sound_bank', 'eager')
+        self.sound_bank_mb = int(config.get('sound_bank_mb', '128'))
+        self.audio_output = config.get('audio_output', 'play')
+        self.trigger_mode = config.get('trigger_mode', 'distance')
+        self.lead_time = float(config.get('lead_time', '1.0'))
+        self.ui_rate = float(config.get('ui_rate', '15'))
+        self.startup_report = ast.literal_eval(config.get('startup_report', 'False'))
+        report.mark('config')
 
         if not self.co_driver:  # First run.
             self.show_settings()
         if not self.co_driver:
             sys.exit()
 
-        q_cfg.put_nowait((self.server, self.co_driver, self.delay-100, self.volume, self.countdown))
-
         self.co_path = os.path.join(app_path, 'co-drivers', self.co_driver)
         self.pace_path = os.path.join(self.co_path, 'pacenotes')
         self.sound_path = os.path.join(self.co_path, 'sounds')
         self.sound_list = defaultdict(list)
         self.sounds_csv = os.path.join(self.co_path, 'sounds.csv')
 
-        self.dic_stages = defaultdict(list)
-        self.read_stages()
-        self.read_audio()
+        self.stage_index = StageIndex(self.stage_tolerance)
+        self.snd_file_list = []
+        self.loaded_max = 0
+        self.reader = None
+        self.taskbar = None
+        self.progress = None
+        Thread(target=self.read_resources, daemon=True).start()  # Stages and sounds, while the window opens.
 
         self.file_handle = ''
         self.file_name = ''
@@ -792,17 +493,13 @@ class DiRTyPacenotes(wx.Frame):
         self.curr_line = None
         self.prev_line = None
         self.last_dist = -20
-        self.cbs = set()
-        self.cbs_by_id = set()
-        self.checkboxes = set()
         self.line_pace = None
         self.line_pace_by_id = 0
         self.from_, self.to_ = (0, 0)
         self.sel_length = 0
         self.line_end = 0
-        self.dic_lines = {}
-        self.dic_entries = {}
-        self.end = 0
+        self.highlight = HighlightCursor()
+        self.document = PacenoteDocument()
         self.count_error = 0
         self.count_auto = 0
         self.hint = 'pacenotes'
@@ -824,9 +521,7 @@ class DiRTyPacenotes(wx.Frame):
         self.menu_bar.EnableTop(3, False)
 
         self.editor = Editor(self)
-
-        self.read_sounds()
-        self.reload_sounds()
+        self.editor.tabs.Disable()
 
         self.persist_manager = per.PersistenceManager.Get()
         config_file = os.path.join(data_path, self.editor.tabs.GetName())
@@ -837,24 +532,78 @@ class DiRTyPacenotes(wx.Frame):
         self.statusbar.SetName('status')
         self.statusbar.SetStatusText('Processing audio files, please wait...')
 
-        self.taskbar = TaskBar(self)  # Create taskbar icon.
-
-        self.reader = Reader()  # Start UDP thread.
+        self.bridge = UIBridge(self.post, self.ui_rate)  # Telemetry updates at the GUI frame rate.
+        self.writer = StageWriter(self.bridge.notify)  # Saves off the GUI thread.
+        self.document.subscribe(self.journal_changes)
 
         pub.subscribe(self.get_progress, 'get_progress')
         pub.subscribe(self.get_stage, 'get_stage')
         pub.subscribe(self.get_dist, 'get_dist')
         pub.subscribe(self.get_pause, 'get_pause')
         pub.subscribe(self.key_error, 'key_error')
+        pub.subscribe(self.sounds_missing, 'sounds_missing')
+        pub.subscribe(self.stage_ambiguous, 'stage_ambiguous')
+        pub.subscribe(self.save_error, 'save_error')
         # pub.subscribe(self.get_stage_length, 'get_stage_length')
 
-        self.progress = wx.Gauge(self.statusbar, pos=(265, 4), range=self.loaded_max)
-
         self.Bind(wx.EVT_TIMER, self.on_timer_error, self.timer_error)
         self.Bind(wx.EVT_TIMER, self.on_timer_auto, self.timer_auto)
         self.Bind(wx.EVT_CLOSE, self.on_quit)
 
         wx.CallAfter(self.register_controls)
+        wx.CallAfter(self.create_taskbar)
+        report.mark('window built')
+
+    # Stage table, sound files and sound categories, parsed off the GUI thread.
+    def read_resources(self):
+        try:
+            self.stage_index.read(os.path.join(data_path, 'stages.csv'))
+            stages_found = True
+        except IOError:
+            stages_found = False
+        snd_files = glob.glob(self.sound_path + '/*')
+        try:
+            sound_list = read_sound_list(self.sounds_csv)
+        except IOError:
+            sound_list = None
+        wx.CallAfter(self.on_resources, stages_found, snd_files, sound_list)
+
+    def on_resources(self, stages_found, snd_files, sound_list):
+        report.mark('stages and sounds read')
+        if not stages_found:
+            self.SetStatusText('stages.csv file not found')
+            self.on_error()
+        elif self.stage_index.skipped:
+            self.SetStatusText('stages.csv lines {} skipped, not length,pos_start,name,folder'.format(
+                ', '.join(str(number) for number in self.stage_index.skipped)))
+        self.snd_file_list = snd_files
+        self.loaded_max = len(snd_files)
+        if sound_list is None:
+            self.reload_sounds()  # Asks to create the co-driver.
+        else:
+            self.sound_list.update(sound_list)
+            self.show_sounds()
+        self.progress = wx.Gauge(self.statusbar, pos=(265, 4), range=self.loaded_max)
+        self.start_reader()
+
+    def start_reader(self):
+        reader_config = {'server': self.server, 'pace_path': self.pace_path, 'delay': self.delay - 100,
+                         'volume': self.volume, 'countdown': self.countdown, 'drain': self.drain,
+                         'record': self.record, 'co_driver': self.co_driver,
+                         'phrase_cache_mb': self.phrase_cache_mb, 'sound_bank': self.sound_bank,
+                         'sound_bank_mb': self.sound_bank_mb, 'audio_output': self.audio_output,
+                         'trigger_mode': self.trigger_mode, 'lead_time': self.lead_time,
+                         'sound_cache': os.path.join(data_path, 'cache', self.co_driver)}
+        if self.backend == 'asyncio':
+            backend = report.load('engine').AsyncReader
+        else:
+            backend = report.load('reader').Reader
+        self.reader = backend(reader_config, self.stage_index, self.snd_file_list, {}, control,
+                              self.bridge.notify)  # Start UDP thread.
+        report.mark('reader started')
+
+    def create_taskbar(self):
+        self.taskbar = dialogs().TaskBar(self)  # Create taskbar icon.
 
     # Define methods.
     # Creator.
@@ -954,42 +703,40 @@ class DiRTyPacenotes(wx.Frame):
                 name2 = grandchild.GetName()
 
     def on_play(self, event=None):
-        snd = self.editor.input_pace.GetValue().split()
-        for sound_name in snd:
-            try:
-                sound_pace = sound_bank[sound_name] + self.volume
-                play(sound_pace)
-            except KeyError:
-                self.key_error(sound_name)
-                pass
+        if self.reader is None:  # Still reading stages and sounds.
+            return
+        self.reader.player.play_phrase(self.editor.input_pace.GetValue(), self.volume)
 
     def on_cancel(self, event):
         self.clear_input_pace()
 
-    def read_audio(self):
-        snd_file_list = glob.glob(self.sound_path + '/*')
-        q_snd.put_nowait(snd_file_list)
-        self.loaded_max = len(snd_file_list)
+    # Post Reader messages to the GUI thread.
+    @staticmethod
+    def post(updates):
+        wx.CallAfter(DiRTyPacenotes.deliver, updates)
+
+    @staticmethod
+    def deliver(updates):
+        for topic, kwargs in updates:
+            pub.sendMessage(topic, **kwargs)
 
     def get_progress(self, arg):
         self.progress.SetValue(arg)
         if arg == self.loaded_max:
             self.progress.Destroy()
             self.SetStatusText('Open pacenotes file or start recce')
+            report.mark('sounds loaded')
+            if self.startup_report:
+                report.write(os.path.join(data_path, 'startup.txt'))
 
     def get_pause(self, arg):
         self.pause = arg
 
     def read_sounds(self):
         try:
+            sound_list = read_sound_list(self.sounds_csv)
             self.sound_list.clear()
-            with open(self.sounds_csv, 'r') as csv_file:
-                csv_data = csv.DictReader(csv_file)
-                for row in csv_data:
-                    pair = list(row.items())  # list of tuples of (key, value) pairs
-                    for key, value in pair:
-                        if value:
-                            self.sound_list[key].append(value)  # dict with multiple values for same keys
+            self.sound_list.update(sound_list)
         except IOError:
             wx.MessageBox('Create your co-driver', 'CO-DRIVER ERROR', wx.OK | wx.ICON_ERROR)
             self.show_creator()
@@ -999,31 +746,16 @@ class DiRTyPacenotes(wx.Frame):
         self.show_creator()
 
     def show_creator(self):
-        self.creator = Creator(self)
+        self.creator = dialogs().Creator(self)
         self.creator.ShowModal()
 
     def on_settings(self, event):
         self.show_settings()
 
     def show_settings(self):
-        self.settings = Settings(self)
+        self.settings = dialogs().Settings(self)
         self.settings.ShowModal()
 
-    def read_stages(self):
-        try:
-            with open(os.path.join(app_path, 'data\\stages.csv'), 'r') as f:
-                _ = next(f)
-                for line in f:
-                    row = line.strip()
-                    lis = row.partition(',')  # tuple
-                    key = float(lis[0])  # key as float
-                    val = lis[2]  # value as string
-                    self.dic_stages[key].append(val)  # dictionary
-        except IOError:
-            self.SetStatusText('stages.csv file not found')
-            self.on_error()
-        q_stg.put_nowait(self.dic_stages)
-
     def get_config(self):
         if not os.path.exists(config_ini):
             self.create_config(self)
@@ -1040,6 +772,18 @@ class DiRTyPacenotes(wx.Frame):
         config['volume'] = '5'
         config['countdown'] = 'True'
         config['handbrake'] = 'N/A'
+        config['drain'] = 'False'
+        config['backend'] = 'thread'
+        config['record'] = ''
+        config['stage_tolerance'] = '0.01'
+        config['phrase_cache_mb'] = '64'
+        config['sound_bank'] = 'eager'
+        config['sound_bank_mb'] = '128'
+        config['audio_output'] = 'play'
+        config['trigger_mode'] = 'distance'
+        config['lead_time'] = '1.0'
+        config['ui_rate'] = '15'
+        config['startup_report'] = 'False'
         config.write()
 
     @staticmethod
@@ -1053,6 +797,18 @@ class DiRTyPacenotes(wx.Frame):
         config['volume'] = self.volume
         config['countdown'] = self.countdown
         config['handbrake'] = self.handbrake
+        config['drain'] = self.drain
+        config['backend'] = self.backend
+        config['record'] = self.record
+        config['stage_tolerance'] = self.stage_tolerance
+        config['phrase_cache_mb'] = self.phrase_cache_mb
+        config['sound_bank'] = self.sound_bank
+        config['sound_bank_mb'] = self.sound_bank_mb
+        config['audio_output'] = self.audio_output
+        config['trigger_mode'] = self.trigger_mode
+        config['lead_time'] = self.lead_time
+        config['ui_rate'] = self.ui_rate
+        config['startup_report'] = self.startup_report
         config.write()
 
     def on_change_handbrake(self, event):
@@ -1071,6 +827,8 @@ class DiRTyPacenotes(wx.Frame):
                 if dlg.ShowModal() == wx.ID_YES:
                     self.write_file()
                     wx.MessageBox(self.file_name + ' has been saved', 'Confirmation', wx.OK | wx.ICON_INFORMATION)
+                else:
+                    self.writer.discard(self.file_handle)
         self.stage_name = arg1
         self.stage_path = arg2
         self.update_stage()
@@ -1083,7 +841,7 @@ class DiRTyPacenotes(wx.Frame):
         self.editor.slider_volume.Enable()
         self.editor.button_play.Enable()
         self.editor.label_delay.SetForegroundColour('dark grey')
-        q_vol.put_nowait(self.volume)
+        control.send(VOLUME, self.volume)
         self.update_delay()
 
     def get_dist(self, arg1, arg2):
@@ -1095,34 +853,24 @@ class DiRTyPacenotes(wx.Frame):
         if self.curr_dist >= 0 and not self.editor.input_dist.HasFocus():
             self.editor.input_dist.SetValue(self.curr_dist)
 
-        # Manage scrolling.
-        sort_keys = sorted(list(self.dic_lines.keys()), key=int)
-        lines = []
-        for index, d in enumerate(sort_keys):
-            lines.append(index)
-            if index < (len(sort_keys)):
-                self.curr_line = self.dic_lines[sort_keys[index]]
-                self.prev_line = self.dic_lines[sort_keys[index - 1]]
-            if self.curr_dist > self.last_dist:
-                if self.curr_dist == int(d) - (self.delay - 100):
-                    # print self.editor.scrolled_panel.GetScrollPos(wx.VERTICAL), 'pos'
-                    # print self.editor.scrolled_panel.GetScrollLines(wx.VERTICAL), 'lines'
-                    self.curr_line.SetFont(self.font.Bold())
-                    self.prev_line.SetFont(self.font)
-                    # print index, d, 'index'  # TODO
-                    if index > 1:
-                        self.editor.scrolled_panel.ScrollLines(3)
-                        self.Refresh()
-            # elif self.curr_dist < self.last_dist:  # If going wrong way.
-            #     self.curr_line.SetFont(self.font)
-            #     self.prev_line.SetFont(self.font)
-            #     self.Refresh()
-            elif self.curr_dist == 0:  # If at the start line.
-                self.editor.scrolled_panel.Scroll(0, 0)
-                for l in lines:
-                    self.curr_line = self.dic_lines[sort_keys[l]]
-                    self.curr_line.SetFont(self.font)
-                self.Refresh()
+        # Manage highlighting and scrolling.
+        change = self.highlight.update(self.curr_dist)
+        if change is None:
+            return
+        old_key, new_key, index = change
+        self.editor.table.bold = new_key
+        self.editor.refresh_row(old_key)
+        if new_key is None:  # At the start line.
+            self.editor.grid.Scroll(0, 0)
+        else:
+            self.editor.refresh_row(new_key)
+            if index > 1 and self.curr_dist > self.last_dist:
+                self.editor.grid.ScrollLines(3)
+
+    def update_highlight(self):
+        self.highlight.compile(self.document, self.delay - 100)
+        self.editor.table.bold = self.highlight.key()
+
     '''
     def get_stage_length(self, arg):
         self.stage_length = arg
@@ -1133,7 +881,7 @@ class DiRTyPacenotes(wx.Frame):
     '''
     def on_delay(self, event):
         self.delay = event.GetId()
-        q_del.put_nowait(self.delay - 100)
+        control.send(DELAY, self.delay - 100)
         self.update_delay()
         delay = self.menu_bar.delay_menu.FindItemById(self.delay).GetItemLabelText()
         self.SetStatusText('Pacenote calls set to ' + delay)
@@ -1144,11 +892,21 @@ class DiRTyPacenotes(wx.Frame):
         else:
             self.delay_mode = 'STAGE'
         self.editor.label_delay.SetLabel(self.delay_mode)
+        self.update_highlight()
 
     def key_error(self, arg):
         self.statusbar.SetStatusText('\'' + arg + '\'' + ' not found in ' + self.co_driver + '\'s Sounds folder')
         self.on_error()
 
+    def sounds_missing(self, arg):
+        self.statusbar.SetStatusText(', '.join('\'' + sound + '\'' for sound in arg) + ' not found in '
+                                     + self.co_driver + '\'s Sounds folder')
+        self.on_error()
+
+    def stage_ambiguous(self, arg):
+        self.statusbar.SetStatusText('Stage not recognised, it could be ' + ' or '.join(arg))
+        self.on_error()
+
     def on_error(self):
         self.statusbar.SetBackgroundColour('RED')
         self.statusbar.Refresh()
@@ -1193,20 +951,25 @@ class DiRTyPacenotes(wx.Frame):
                 dlg = wx.MessageDialog(self, self.file_name + ' has been saved', 'Confirmation',
                                        wx.OK | wx.ICON_INFORMATION)
                 dlg.ShowModal()
+            else:
+                self.writer.discard(self.file_handle)
         elif not self.stage_name:  # from 'Create your co-driver'
             pass
         self.persist_manager.SaveAndUnregister(self.editor.tabs)
         pub.unsubAll()
-        udp_running = False
-        q_run.put_nowait(udp_running)
-        self.reader.join(0.5)
+        self.writer.close()
+        self.bridge.stop()
+        control.send(QUIT)
+        if self.reader is not None:
+            self.reader.join(0.5)
         self.update_config(self)
-        self.taskbar.Destroy()
+        if self.taskbar is not None:
+            self.taskbar.Destroy()
         self.Destroy()
 
     def on_save(self, event):
         if event.GetId() == wx.ID_SAVE:  # From menu.
-            if self.checkboxes:
+            if self.document:
                 if self.modified:
                     self.write_file()
                     self.SetStatusText(self.file_name + ' has been saved')
@@ -1270,22 +1033,36 @@ class DiRTyPacenotes(wx.Frame):
                 self.update_config(self)
                 self.settings.Destroy()
 
+    # Queue a snapshot for the writer thread, it replaces the file atomically.
     def write_file(self):
         self.file_handle = os.path.join(self.stage_path, self.file_name)
-        with open(self.file_handle, 'w') as f:
-            for dist in sorted(self.dic_entries, key=int):
-                pace = self.dic_entries[dist]
-                line = '{},{}'.format(dist, pace)
-                f.write(line + '\n')
+        self.writer.save(self.file_handle, self.document.items())
         self.modified = False
 
+    def save_error(self, arg):
+        self.modified = True
+        self.SetStatusText(arg)
+        self.on_error()
+
+    # Journal edits until the next save, open_file replays them after a crash.
+    def journal_changes(self, changes):
+        if not self.file_handle:
+            return
+        for change in changes:
+            if change.kind in (INSERTED, UPDATED):
+                self.writer.journal(self.file_handle, SET, change.dist, self.document[change.dist])
+            elif change.kind == DELETED:
+                self.writer.journal(self.file_handle, DELETE, change.dist)
+
     def on_open(self, event):
-        if self.stage_name and self.checkboxes and self.modified:
+        if self.stage_name and self.document and self.modified:
             dlg = wx.MessageDialog(self, 'Do you want to save ' + self.file_name + '?', 'Confirm',
                                    wx.YES_NO | wx.YES_DEFAULT | wx.ICON_WARNING)
             dlg_choice = dlg.ShowModal()
             if dlg_choice == wx.ID_YES:
                 self.on_save(event)
+            else:
+                self.writer.discard(self.file_handle)
         dlg = wx.FileDialog(self, 'Open pacenotes file', self.pace_path, '', 'Text files (*.txt)|*.txt',
                             wx.FD_OPEN | wx.FD_FILE_MUST_EXIST)
         if dlg.ShowModal() == wx.ID_OK:
@@ -1297,25 +1074,19 @@ class DiRTyPacenotes(wx.Frame):
         self.editor.label_delay.SetLabel('NOTES')
 
     def open_file(self):
-        self.editor.scrolled_panel.DestroyChildren()
-        self.dic_entries.clear()
-        self.dic_lines.clear()
         self.SetTitle(self.title)
+        self.file_handle = ''  # Not journaled while loading.
         file_handle = os.path.join(self.stage_path, self.file_name)
         try:
             with open(file_handle, 'r') as f:
-                for line in f:
-                    if line and line.split():
-                        lis = line.partition(',')  # tuple
-                        self.dist = int(lis[0])
-                        self.pace = lis[2]
-                        self.create_pacenotes()
-                    else:
-                        continue
+                self.document.load(f)
         except IOError:
+            self.document.clear()
             self.SetStatusText(self.file_name + ' not found in ' + self.co_driver + '\'s Pacenotes folder')
             self.on_error()
             return
+        finally:
+            self.show_pacenotes()
         self.menu_bar.menu_save.Enable(True)
         self.menu_bar.EnableTop(1, True)
         self.menu_bar.EnableTop(2, True)
@@ -1329,45 +1100,29 @@ class DiRTyPacenotes(wx.Frame):
         self.SetTitle(self.title + ' - ' + self.stage_name)
         self.modified = False
         self.on_autosave()
-
-    def create_pacenotes(self):
-        text_dist = ict.IntCtrl(self.editor.scrolled_panel, id=self.dist, name='dist', value=self.dist, min=1, max=19999,
-                                size=wx.Size(45, 23), style=wx.TE_PROCESS_ENTER, limited=True, allow_none=False)
-        text_pace = wx.TextCtrl(self.editor.scrolled_panel, id=self.dist, name='pace', value=self.pace)
-        tick = wx.CheckBox(self.editor.scrolled_panel, id=int(self.dist), name='tick')
-        text_pace.SetEditable(False)
-        text_pace.SetCursor(wx.Cursor(wx.CURSOR_ARROW))
-
-        h_box_scr = wx.BoxSizer(wx.HORIZONTAL)
-        h_box_scr.Add(tick, 0, wx.ALIGN_CENTER_VERTICAL | wx.LEFT, 3)
-        h_box_scr.Add(text_dist, 0, wx.LEFT, 2)
-        h_box_scr.Add(text_pace, 1, wx.EXPAND | wx.LEFT, 1)
-        self.editor.v_box.Add(h_box_scr, 0, wx.EXPAND | wx.BOTTOM, 1)
-
-        self.editor.scrolled_panel.Layout()
-        self.editor.scrolled_panel.FitInside()
-        self.end = self.editor.scrolled_panel.GetScrollLines(wx.VERTICAL)
-
-        text_dist.Bind(wx.EVT_TEXT_ENTER, self.on_distance)
-        text_pace.Bind(wx.EVT_MOUSE_CAPTURE_CHANGED, self.on_selection)
-        self.Bind(wx.EVT_CHECKBOX, self.on_tick)
-
-        self.dic_lines[self.dist] = text_pace
-        self.dic_entries[self.dist] = self.pace.strip('\n')
-        self.checkboxes.add(tick)
-
+        recovered = recover(file_handle, self.document)
+        self.file_handle = file_handle
+        if recovered:
+            self.reload_pacenotes()
+            self.SetStatusText('{} unsaved edits recovered, save to keep them'.format(recovered))
+
+    # Show the document in the editor, rows are drawn on demand.
+    def show_pacenotes(self):
+        self.update_highlight()
+        self.editor.show_grid()
+
+    # After an edit, the grid has already updated the rows the document changed.
     def reload_pacenotes(self):
-        self.editor.scrolled_panel.DestroyChildren()
-        self.checkboxes.clear()
-        for dist in sorted(self.dic_entries, key=int):
-            self.dist = int(dist)
-            self.pace = self.dic_entries[dist].strip('\n')
-            self.create_pacenotes()
-        q_dic.put_nowait(self.dic_entries)
+        self.document.tick_all(False)
+        self.update_highlight()
+        control.send(PACENOTES, self.document.to_dict())
         self.modified = True
 
     def reload_sounds(self):
         self.read_sounds()
+        self.show_sounds()
+
+    def show_sounds(self):
         self.editor.tabs.DeleteAllPages()
         for category, sounds_list in list(self.sound_list.items()):
             tab = wx.Panel(self.editor.tabs, name=category)
@@ -1399,28 +1154,21 @@ class DiRTyPacenotes(wx.Frame):
         self.dist = self.editor.input_dist.GetValue()
         if self.stage_name:
             if self.dist != 0:
-                for dist in self.dic_entries:
-                    if self.dist == dist:
-                        dlg = wx.MessageDialog(self, 'Replace pacenotes for current distance?', 'Confirm',
-                                               wx.YES_NO | wx.NO_DEFAULT | wx.ICON_QUESTION)
-                        dlg_choice = dlg.ShowModal()
-                        if dlg_choice == wx.ID_YES:
-                            self.add_pacenotes()
-                            sort_keys = sorted(list(self.dic_lines.keys()), key=int)
-                            for index, d in enumerate(sort_keys):
-                                if self.dist == d:
-                                    self.editor.scrolled_panel.Scroll(0, index)
-                            self.SetStatusText('Pacenotes replaced')
-                            return
-                        elif dlg_choice == wx.ID_NO:
-                            dlg.Destroy()
-                            self.SetStatusText('Operation cancelled')
-                            return
+                if self.dist in self.document:
+                    dlg = wx.MessageDialog(self, 'Replace pacenotes for current distance?', 'Confirm',
+                                           wx.YES_NO | wx.NO_DEFAULT | wx.ICON_QUESTION)
+                    dlg_choice = dlg.ShowModal()
+                    if dlg_choice == wx.ID_YES:
+                        self.add_pacenotes()
+                        self.scroll_to(self.dist)
+                        self.SetStatusText('Pacenotes replaced')
+                        return
+                    elif dlg_choice == wx.ID_NO:
+                        dlg.Destroy()
+                        self.SetStatusText('Operation cancelled')
+                        return
                 self.add_pacenotes()
-                sort_keys = sorted(list(self.dic_lines.keys()), key=int)
-                for index, d in enumerate(sort_keys):
-                    if self.dist == d:
-                        self.editor.scrolled_panel.Scroll(0, index)
+                self.scroll_to(self.dist)
                 self.SetStatusText('Pacenotes added')
             else:
                 self.SetStatusText('Distance cannot be 0')
@@ -1431,7 +1179,7 @@ class DiRTyPacenotes(wx.Frame):
 
     def add_pacenotes(self):
         self.pace = self.editor.input_pace.GetValue()
-        self.dic_entries[self.dist] = self.pace.strip('\n')
+        self.document.set(self.dist, self.pace)
         self.reload_pacenotes()
         self.editor.button_add.Disable()
         self.editor.button_insert.Disable()
@@ -1444,7 +1192,7 @@ class DiRTyPacenotes(wx.Frame):
         else:  # Insert pacenote after selection.
             self.line_pace.SetInsertionPoint(self.to_)
         self.line_pace.WriteText(self.editor.input_pace.GetValue())
-        self.dic_entries[self.line_pace_by_id] = self.line_pace.GetValue().replace('\n', '')
+        self.document.set(self.line_pace_by_id, self.line_pace.GetValue().replace('\n', ''))
         self.reload_pacenotes()
         self.editor.button_add.Disable()
         self.editor.button_insert.Disable()
@@ -1452,15 +1200,12 @@ class DiRTyPacenotes(wx.Frame):
         self.editor.button_delete.Disable()
         self.clear_input_pace()
         self.editor.button_play.Disable()
-        sort_keys = sorted(list(self.dic_lines.keys()), key=int)
-        for index, d in enumerate(sort_keys):
-            if self.line_pace_by_id == int(d):
-                self.editor.scrolled_panel.Scroll(0, index)
+        self.scroll_to(self.line_pace_by_id)
         self.SetStatusText('Pacenote inserted')
 
     def on_replace(self, event):
         self.line_pace.Replace(self.from_, self.to_, self.editor.input_pace.GetValue())
-        self.dic_entries[self.line_pace_by_id] = self.line_pace.GetValue().strip('\n')
+        self.document.set(self.line_pace_by_id, self.line_pace.GetValue())
         self.reload_pacenotes()
         self.editor.button_add.Disable()
         self.editor.button_insert.Disable()
@@ -1468,48 +1213,46 @@ class DiRTyPacenotes(wx.Frame):
         self.editor.button_delete.Disable()
         self.clear_input_pace()
         self.editor.button_play.Disable()
-        sort_keys = sorted(list(self.dic_lines.keys()), key=int)
-        for index, d in enumerate(sort_keys):
-            if self.line_pace_by_id == int(d):
-                self.editor.scrolled_panel.Scroll(0, index)
+        self.scroll_to(self.line_pace_by_id)
         self.SetStatusText('Pacenote replaced')
 
     def on_delete(self, event):
-        if self.cbs_by_id:  # Remove checked lines.
-            for dist in self.cbs_by_id:
-                del self.dic_entries[dist]
-                del self.dic_lines[dist]
-            self.cbs.clear()
-            self.cbs_by_id.clear()
-            self.checkboxes.clear()
+        if self.document.ticked:  # Remove checked lines.
+            self.document.delete_ticked()
             self.editor.button_delete.Disable()
             self.menu_bar.menu_select_all.Check(False)
         else:  # Remove selected text.
             self.line_pace.Remove(self.from_, self.to_)
-            dic_2 = {}
-            dic_2[self.line_pace_by_id] = self.line_pace.GetValue().strip('\n')
-            self.dic_entries.update(dic_2)
+            self.document.set(self.line_pace_by_id, self.line_pace.GetValue())
         self.reload_pacenotes()
         self.clear_input_pace()
         self.editor.button_play.Disable()
-        sort_keys = sorted(list(self.dic_lines.keys()), key=int)
-        for index, d in enumerate(sort_keys):
-            if self.line_pace_by_id == int(d):
-                self.editor.scrolled_panel.Scroll(0, index)
+        self.scroll_to(self.line_pace_by_id)
         self.SetStatusText('Pacenote deleted')
 
+    # Pacenote cell editor is one TextCtrl reused by all rows, read-only for selecting words.
+    def on_editor_created(self, event):
+        if event.GetCol() == PacenoteTable.PACE:
+            cell_editor = event.GetControl()
+            cell_editor.SetName('pace')
+            cell_editor.SetEditable(False)
+            cell_editor.SetCursor(wx.Cursor(wx.CURSOR_ARROW))
+            cell_editor.Bind(wx.EVT_MOUSE_CAPTURE_CHANGED, self.on_selection)
+        event.Skip()
+
+    def on_editor_shown(self, event):
+        if event.GetCol() == PacenoteTable.PACE:
+            self.line_pace_by_id = self.document.dist_at(event.GetRow())
+        event.Skip()
+
     def on_selection(self, event):
         self.line_pace = event.GetEventObject()
         line_pace_by_name = self.line_pace.GetName()
-        self.line_pace_by_id = self.line_pace.GetId()
         self.from_, self.to_ = self.line_pace.GetSelection()
         self.line_end = self.line_pace.GetLastPosition()
         self.sel_length = self.to_ - self.from_
-        if self.cbs:  # Clear any ticks.
-            for cb in self.cbs:
-                cb.SetValue(False)
-            self.cbs.clear()
-            self.cbs_by_id.clear()
+        if self.document.ticked:  # Clear any ticks.
+            self.document.tick_all(False)
         else:
             if line_pace_by_name == 'pace':
                 if self.sel_length > 0:
@@ -1530,25 +1273,24 @@ class DiRTyPacenotes(wx.Frame):
                     self.editor.button_replace.Disable()
                     self.editor.button_delete.Disable()
 
+    # Distance edited in the grid.
+    def move_pacenote(self, old_dist, dist):
+        self.document.move(old_dist, dist)
+        self.reload_pacenotes()
+        self.scroll_to(dist)
+        self.SetStatusText('Distance updated')
+
+    def scroll_to(self, dist):
+        row = self.editor.table.row(dist)
+        if row >= 0:
+            self.editor.grid.MakeCellVisible(row, PacenoteTable.PACE)
+
     def on_distance(self, event):
         line_dist = event.GetEventObject()
         line_dist_by_name = line_dist.GetName()
-        line_dist_by_id = line_dist.GetId()
         self.dist = line_dist.GetValue()
         if self.dist:
-            if line_dist_by_name == 'dist':  # Processed by Enter.
-                if self.dist != line_dist_by_id:
-                    self.dic_entries[self.dist] = self.dic_entries.pop(line_dist_by_id, '')
-                    self.dic_lines[self.dist] = self.dic_lines.pop(line_dist_by_id, '')
-                    self.reload_pacenotes()
-                    sort_keys = sorted(list(self.dic_lines.keys()), key=int)
-                    for index, d in enumerate(sort_keys):
-                        if self.line_pace_by_id == int(d):
-                            self.editor.scrolled_panel.Scroll(0, index)
-                    self.SetStatusText('Distance updated')
-                else:
-                    self.statusbar.Refresh()
-            elif line_dist_by_name == 'input':
+            if line_dist_by_name == 'input':
                 if self.editor.input_pace.GetValue():
                     self.editor.button_add.Enable()
                     self.editor.button_play.Enable()
@@ -1575,37 +1317,26 @@ class DiRTyPacenotes(wx.Frame):
                 for button in self.editor.buttons:
                     button.Disable()
 
-    def on_tick(self, event):
+    # Tick column edited in the grid.
+    def tick_row(self, dist, checked):
         self.editor.button_insert.Disable()
         self.editor.button_replace.Disable()
-        cb = event.GetEventObject()
-        cb_by_id = event.GetId()
-        if cb_by_id != 20000:
-            if cb.IsChecked():
-                self.cbs.add(cb)
-                self.cbs_by_id.add(cb_by_id)
-                self.editor.button_delete.Enable()
-                self.menu_bar.menu_select_all.IsChecked()
-            else:
-                self.cbs.remove(cb)
-                self.cbs_by_id.remove(cb_by_id)
-            if not self.cbs:
-                self.editor.button_delete.Disable()
-            self.menu_bar.menu_select_all.Check(False)
+        self.document.tick(dist, checked)
+        if checked:
+            self.editor.button_delete.Enable()
+        if not self.document.ticked:
+            self.editor.button_delete.Disable()
+        self.menu_bar.menu_select_all.Check(False)
 
-        else:  # Select All.
-            for tick in self.checkboxes:
-                tick_by_id = tick.GetId()
-                if self.menu_bar.menu_select_all.IsChecked():
-                    self.cbs.add(tick)
-                    self.cbs_by_id.add(tick_by_id)
-                    tick.SetValue(True)
-                    self.editor.button_delete.Enable()
-                else:
-                    self.cbs.clear()
-                    self.cbs_by_id.clear()
-                    tick.SetValue(False)
-                    self.editor.button_delete.Disable()
+    def on_tick(self, event):  # Select All.
+        self.editor.button_insert.Disable()
+        self.editor.button_replace.Disable()
+        if self.menu_bar.menu_select_all.IsChecked() and self.document:
+            self.document.tick_all(True)
+            self.editor.button_delete.Enable()
+        else:
+            self.document.tick_all(False)
+            self.editor.button_delete.Disable()
 
     def on_undo_select(self, event):
         # stock_undo = []
@@ -1616,34 +1347,10 @@ class DiRTyPacenotes(wx.Frame):
     def on_slider(self, event):
         evt = event.GetEventObject()
         self.volume = evt.GetValue()
-        q_vol.put_nowait(self.volume)
+        control.send(VOLUME, self.volume)
 
     def on_about(self, event):
-        description = wordwrap('DiRTy Pacenotes lets you create your own pacenotes\n'
-                               'for DiRT Rally and DiRT Rally 2.0 stages.\n'
-                               'These custom pacenotes will be read by the co-driver of your choice.\n', 420,
-                               wx.ClientDC(self))
-
-        licence = wordwrap('Licensed under the Apache License, Version 2.0 (the "License");\n'
-                           'you may not use this software except in compliance with the License.\n'
-                           'You may obtain a copy of the License at\n'
-                           'http://www.apache.org/licenses/LICENSE-2.0\n'
-                           'Unless required by applicable law or agreed to in writing,\n'
-                           'software distributed under the License is distributed on an "AS IS" BASIS,\n'
-                           'WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,\n'
-                           'either express or implied. See the License for the specific language\n'
-                           'governing permissions and limitations under the License.', 420, wx.ClientDC(self))
-        icon = wx.Icon(os.path.join(img_path, 'icon.png'))
-
-        info = wx.adv.AboutDialogInfo()
-
-        info.SetName('DiRTy Pacenotes')
-        info.SetVersion('2.5.1')
-        info.SetIcon(icon)
-        info.SetDescription(description)
-        info.SetCopyright('(C) 2017 - 2019 Palo Samo')
-        info.SetLicence(licence)
-        wx.adv.AboutBox(info)
+        dialogs().show_about(self, img_path)
 
     @staticmethod
     def restart_app(self):
@@ -1652,8 +1359,13 @@ class DiRTyPacenotes(wx.Frame):
 
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()  # Sound decoding workers of a frozen app.
+    if win32gui is not None:  # Hide the console, not on import.
+        hide = win32gui.GetForegroundWindow()
+        win32gui.ShowWindow(hide, win32con.SW_HIDE)
     app = wx.App()
     frame = DiRTyPacenotes(None)
     frame.Centre()
     frame.Show()
+    wx.CallAfter(report.mark, 'window shown')
     app.MainLoop()
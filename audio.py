@@ -0,0 +1,345 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import statistics
+import time
+import wave
+from collections import deque
+from threading import Event, Lock, Thread
+from soundbank import OUTPUT_FORMAT
+
+try:
+    import audioop  # Removed from the standard library in Python 3.13, audioop-lts provides it.
+except ImportError:
+    audioop = None
+
+try:
+    import pyaudio
+except ImportError:
+    pyaudio = None
+
+
+BLOCK_FRAMES = 512  # Frames mixed at once, about 12 ms at 44.1 kHz.
+RING_BLOCKS = 4  # Mixed blocks buffered ahead of the device.
+INTERRUPT_FADE = 0.005  # Seconds of fade out when a phrase is cut, avoids clicks.
+
+
+# Single producer, single consumer byte ring, each side only moves its own counter
+class RingBuffer:
+    def __init__(self, size):
+        self.buffer = bytearray(size)
+        self.size = size
+        self.head = 0  # Bytes written since start.
+        self.tail = 0  # Bytes read since start.
+        self.underruns = 0
+
+    def available(self):
+        return self.head - self.tail
+
+    def free(self):
+        return self.size - self.available()
+
+    def write(self, data):
+        nbytes = min(len(data), self.free())
+        pos = self.head % self.size
+        first = min(nbytes, self.size - pos)
+        self.buffer[pos:pos + first] = data[:first]
+        self.buffer[:nbytes - first] = data[first:nbytes]
+        self.head += nbytes
+        return nbytes
+
+    # Read nbytes, padded with silence if the producer fell behind.
+    def read(self, nbytes):
+        count = min(nbytes, self.available())
+        pos = self.tail % self.size
+        first = min(count, self.size - pos)
+        data = bytes(self.buffer[pos:pos + first]) + bytes(self.buffer[:count - first])
+        self.tail += count
+        if count < nbytes:
+            self.underruns += 1
+            data += bytes(nbytes - count)
+        return data
+
+
+# Sound being mixed with its gain ramp
+class Voice:
+    def __init__(self, data, gain=1.0):
+        self.data = data
+        self.pos = 0
+        self.gain = gain
+        self.step = 0.0  # Gain change per block.
+
+    def fade(self, seconds, block_seconds, target):
+        blocks = max(1, int(round(seconds / block_seconds)))
+        self.step = (target - self.gain) / blocks
+
+    @property
+    def done(self):
+        return self.pos >= len(self.data) or (self.step < 0 and self.gain <= 0)
+
+    def read(self, nbytes, sample_width):
+        chunk = self.data[self.pos:self.pos + nbytes]
+        self.pos += len(chunk)
+        gain = self.gain
+        if self.step:
+            self.gain = min(1.0, max(0.0, self.gain + self.step))
+            if self.gain >= 1.0:
+                self.step = 0.0
+        if gain != 1.0:
+            chunk = audioop.mul(chunk, sample_width, gain)
+        return chunk
+
+
+# Queued phrases played back to back, interrupted phrases faded out over them
+class Mixer:
+    def __init__(self, sample_width, block_seconds):
+        self.sample_width = sample_width
+        self.block_seconds = block_seconds
+        self.pending = deque()  # Voices waiting for the current one.
+        self.current = None
+        self.fading = []  # Voices faded out under the current one.
+        self.lock = Lock()
+
+    def queue(self, data):
+        with self.lock:
+            self.pending.append(Voice(data))
+
+    # Start data now, the current phrase fades out over seconds.
+    def crossfade(self, data, seconds):
+        voice = Voice(data, gain=0.0)
+        voice.fade(seconds, self.block_seconds, 1.0)
+        with self.lock:
+            self.fade_out(seconds)
+            self.current = voice
+
+    # Cut the current phrase and drop queued ones.
+    def interrupt(self, seconds=INTERRUPT_FADE):
+        with self.lock:
+            self.pending.clear()
+            self.fade_out(seconds)
+
+    def fade_out(self, seconds):
+        if self.current is not None:
+            self.current.fade(seconds, self.block_seconds, 0.0)
+            self.fading.append(self.current)
+            self.current = None
+
+    def busy(self):
+        return bool(self.current or self.pending or self.fading)
+
+    # Mix nbytes of output, return data and [(offset, voice)] of phrases started in it.
+    def mix(self, nbytes):
+        starts = []
+        parts = []
+        remaining = nbytes
+        with self.lock:
+            while remaining and (self.current or self.pending):
+                if self.current is None:
+                    self.current = self.pending.popleft()
+                if self.current.pos == 0:
+                    starts.append((nbytes - remaining, self.current))
+                chunk = self.current.read(remaining, self.sample_width)
+                parts.append(chunk)
+                remaining -= len(chunk)
+                if self.current.done:
+                    self.current = None
+            data = b''.join(parts) + bytes(remaining)
+            for voice in self.fading:
+                chunk = voice.read(nbytes, self.sample_width)
+                data = audioop.add(data, chunk + bytes(nbytes - len(chunk)), self.sample_width)
+            self.fading = [voice for voice in self.fading if not voice.done]
+        return data, starts
+
+
+# One output stream for the session, fed from a ring buffer by a mixer thread
+class AudioEngine(Thread):
+    def __init__(self, sink, output_format=OUTPUT_FORMAT, block_frames=BLOCK_FRAMES, blocks=RING_BLOCKS):
+        if audioop is None:
+            raise ImportError('the audio engine needs audioop, install audioop-lts on Python 3.13 and later')
+        Thread.__init__(self)
+
+        self.frame_rate, self.sample_width, self.channels = output_format
+        self.output_format = tuple(output_format)
+        self.frame_bytes = self.sample_width * self.channels
+        self.block_bytes = block_frames * self.frame_bytes
+        self.block_seconds = block_frames / self.frame_rate
+        self.ring = RingBuffer(self.block_bytes * blocks)
+        self.mixer = Mixer(self.sample_width, self.block_seconds)
+        self.space = Event()  # Set by the consumer after reading.
+        self.marks = deque()  # (stream position, perf_counter when mixed) of started phrases.
+        self.latencies = deque(maxlen=64)  # Seconds from mixing a phrase start to the device.
+        self.audible_end = 0  # Stream position after the last mixed phrase.
+        self.sink = sink
+
+        self.running = True
+        self.setDaemon(True)
+        self.start()
+        sink.open(self)
+
+    def pcm(self, segment):
+        if (segment.frame_rate, segment.sample_width, segment.channels) != self.output_format:
+            segment = segment.set_frame_rate(self.frame_rate).set_sample_width(self.sample_width)
+            segment = segment.set_channels(self.channels)
+        return segment.raw_data
+
+    # Queue segment after the phrases already playing, never blocks.
+    def play(self, segment, crossfade=0.0):
+        if crossfade:
+            self.mixer.crossfade(self.pcm(segment), crossfade)
+        else:
+            self.mixer.queue(self.pcm(segment))
+
+    def interrupt(self):
+        self.mixer.interrupt()
+
+    def run(self):
+        ring = self.ring
+        while self.running:
+            if ring.free() < self.block_bytes:
+                self.space.wait(self.block_seconds)
+                self.space.clear()
+                continue
+            audible = self.mixer.busy()
+            data, starts = self.mixer.mix(self.block_bytes)
+            mixed = time.perf_counter()  # Phrases entering the mix, not their wait behind queued ones.
+            for offset, voice in starts:
+                self.marks.append((ring.head + offset, mixed))
+            ring.write(data)
+            if audible:
+                self.audible_end = ring.head
+
+    # Phrases queued or still in the ring.
+    def busy(self):
+        return self.mixer.busy() or self.ring.tail < self.audible_end
+
+    # Consumer side, called by the sink for every device buffer.
+    def pull(self, nbytes):
+        data = self.ring.read(nbytes)
+        self.space.set()
+        if self.marks:
+            now = time.perf_counter()
+            while self.marks and self.marks[0][0] < self.ring.tail:
+                position, mixed = self.marks.popleft()
+                self.latencies.append(now - mixed + self.sink.latency)
+        return data
+
+    # Seconds from a phrase due to start until it is heard, measured or estimated from the buffers.
+    def latency(self):
+        if self.latencies:
+            return statistics.median(self.latencies)
+        return self.ring.size / (self.frame_rate * self.frame_bytes) + self.sink.latency
+
+    def close(self):
+        self.running = False
+        self.space.set()
+        self.sink.close()
+
+
+# Device output through PortAudio, pulled from its callback thread
+class PyAudioSink:
+    def __init__(self):
+        self.audio = None
+        self.stream = None
+        self.latency = 0.0
+
+    def open(self, engine):
+        def callback(in_data, frame_count, time_info, status):
+            return engine.pull(frame_count * engine.frame_bytes), pyaudio.paContinue
+
+        self.audio = pyaudio.PyAudio()
+        self.stream = self.audio.open(format=self.audio.get_format_from_width(engine.sample_width),
+                                      channels=engine.channels, rate=engine.frame_rate, output=True,
+                                      frames_per_buffer=engine.block_bytes // engine.frame_bytes,
+                                      stream_callback=callback)
+        self.latency = self.stream.get_output_latency()
+        self.stream.start_stream()
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.audio.terminate()
+
+
+# Sink pulling blocks at the device rate on its own thread, discards the output
+class NullSink(Thread):
+    def __init__(self, realtime=True):
+        Thread.__init__(self)
+        self.realtime = realtime  # False pulls only while phrases play, as fast as possible.
+        self.latency = 0.0
+        self.frames = 0
+        self.engine = None
+        self.running = True
+        self.setDaemon(True)
+
+    def open(self, engine):
+        self.engine = engine
+        self.start()
+
+    def run(self):
+        engine = self.engine
+        next_block = time.perf_counter()
+        while self.running:
+            if self.realtime:
+                next_block += engine.block_seconds
+                time.sleep(max(0.0, next_block - time.perf_counter()))
+            elif not engine.busy() or engine.ring.available() < engine.block_bytes:
+                time.sleep(engine.block_seconds / 8)  # Never outrun the mixer, underruns would be recorded.
+                continue
+            self.write(engine.pull(engine.block_bytes))
+            self.frames += engine.block_bytes // engine.frame_bytes
+
+    def write(self, data):
+        pass
+
+    def close(self):
+        self.running = False
+
+
+# Output recorded into a WAV file, for headless runs
+class WavSink(NullSink):
+    def __init__(self, wav_file, realtime=True):
+        NullSink.__init__(self, realtime)
+        self.wav_file = wav_file
+        self.wav = None
+
+    def open(self, engine):
+        self.wav = wave.open(self.wav_file, 'wb')
+        self.wav.setnchannels(engine.channels)
+        self.wav.setsampwidth(engine.sample_width)
+        self.wav.setframerate(engine.frame_rate)
+        NullSink.open(self, engine)
+
+    def write(self, data):
+        self.wav.writeframes(data)
+
+    def close(self):
+        NullSink.close(self)
+        self.join()
+        self.wav.close()
+
+
+# Output engine from config value: 'stream', 'null' or a .wav file, None plays every phrase with pydub.
+def open_output(name):
+    if name == 'null':
+        return AudioEngine(NullSink())
+    if name.lower().endswith('.wav'):
+        return AudioEngine(WavSink(name))
+    if name == 'stream' and pyaudio is not None:
+        return AudioEngine(PyAudioSink())
+    return None
@@ -0,0 +1,76 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Per-packet CPU cost of the thread and asyncio Reader backends.
+# Usage: python benchmarks/bench_backends.py [--packets 20000] [--port 20778] [--output results.json]
+# CPU time is measured for the whole process, the sender's share is equal for both backends.
+
+import argparse
+import socket
+import tempfile
+import time
+
+from synthetic import STAGE_LENGTH, blast, make_packet, make_stage, null_sink, NullSoundBank, write_results
+from control import ControlChannel, QUIT
+from engine import AsyncReader
+from pipeline import ON_STAGE
+from playback import Player
+from reader import Reader
+
+
+def run(backend, port, packets, pace_path, stages):
+    config = {'server': ('127.0.0.1', port), 'pace_path': pace_path, 'delay': 100, 'volume': 0,
+              'countdown': False, 'drain': False}
+    control = ControlChannel()
+    player = Player(NullSoundBank(), sink=null_sink)
+    reader = backend(config, stages, [], {}, control, lambda topic, **kwargs: None, player=player)
+    reader.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server = config['server']
+
+    while reader.pipeline.state not in ON_STAGE:  # Detect stage and load pacenotes.
+        sender.sendto(make_packet(1.0, 0.0, 0.0), server)
+        time.sleep(0.01)
+
+    payloads = [make_packet(1.0 + i / 60, 1.0 + i / 60, i * STAGE_LENGTH / packets) for i in range(packets)]
+    cpu, wall = blast(reader.pipeline, sender, server, payloads)
+
+    control.send(QUIT)
+    reader.join(2)
+    sender.close()
+    control.close()
+    return {'cpu_us_per_packet': cpu / packets * 1e6, 'packets_per_s': packets / wall}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare Reader backends')
+    parser.add_argument('--packets', type=int, default=20000)
+    parser.add_argument('--port', type=int, default=20778)
+    parser.add_argument('--output', help='JSON results file, stdout if omitted')
+    args = parser.parse_args()
+
+    results = {'packets': args.packets}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pace_path, stages = make_stage(tmp_dir)
+        for port, backend in enumerate((Reader, AsyncReader), args.port):
+            results[backend.__name__] = run(backend, port, args.packets, pace_path, stages)
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Pacenote document edits at large sizes, without wx.
+# Usage: python benchmarks/bench_document.py [--output results.json]
+
+import argparse
+import random
+import timeit
+
+from synthetic import write_results
+from document import PacenoteDocument
+
+NOTE_COUNTS = (1000, 10000, 100000)
+
+
+def make_document(count):
+    doc = PacenoteDocument()
+    doc.load({dist: 'left 3 into right 4' for dist in range(10, 10 * (count + 1), 10)})
+    doc.subscribe(lambda changes: None)
+    return doc
+
+
+def best(stmt, number):
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number * 1e6
+
+
+def bench(count):
+    doc = make_document(count)
+    rand = random.Random(count)
+    top = 10 * count
+    odd = lambda: rand.randrange(0, top, 10) + 5  # Between two notes.
+
+    def insert_delete():
+        dist = odd()
+        doc.set(dist, 'caution')
+        doc.delete([dist])
+
+    def move():
+        dist = rand.randrange(10, top, 10)
+        doc.move(dist, dist + 5)
+        doc.move(dist + 5, dist)
+
+    return {
+        'insert_delete_us': best(insert_delete, 1000),
+        'move_us': best(move, 1000),
+        'index_us': best(lambda: doc.index(rand.randrange(10, top, 10)), 1000),
+        'tick_us': best(lambda: doc.tick(rand.randrange(10, top, 10), True), 1000),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pacenote document benchmark')
+    parser.add_argument('--output', help='JSON results file, stdout if omitted')
+    args = parser.parse_args()
+
+    results = {str(count): bench(count) for count in NOTE_COUNTS}
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Stage detection and pacenote loading at large sizes.
+# Usage: python benchmarks/bench_loading.py [--output results.json]
+
+import argparse
+import os
+import tempfile
+import timeit
+
+from synthetic import make_stage, write_results
+from pipeline import Pipeline, read_pacenotes
+from stages import Stage, StageIndex
+
+STAGE_COUNTS = (100, 1000, 10000)
+NOTE_COUNTS = (1000, 10000, 100000)
+
+
+# Stage table with every tenth length shared by two stages.
+def make_stages(count):
+    stages = StageIndex()
+    for i in range(count):
+        length = round(2000.0 + i * 1.25, 4)
+        stages.entries.append(Stage(length, i, 'Stage {}'.format(i), 'folder'))
+        if i % 10 == 0:
+            stages.entries.append(Stage(length, i + 1, 'Stage {}b'.format(i), 'folder'))
+    stages.compile()
+    return stages
+
+
+def best(stmt, number):
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number * 1e6
+
+
+def bench_detect(count):
+    stages = make_stages(count)
+    config = {'pace_path': '', 'delay': 100, 'volume': 0, 'countdown': False}
+    pipeline = Pipeline(config, stages, None, lambda topic, **kwargs: None)
+    pipeline.stage_length = round(2000.0 + (count - 1) * 1.25, 4)  # Last stage in the table.
+    pipeline.total_laps = 1
+    pipeline.pos_y = count - 1
+    return best(pipeline.detect_stage, 20)
+
+
+def bench_read(tmp_dir, count):
+    pace_path, stages = make_stage(tmp_dir, density=count // 10, name='Notes{}'.format(count))
+    stage_file = os.path.join(pace_path, 'bench', 'Notes{}.txt'.format(count))
+    return best(lambda: read_pacenotes(stage_file), 5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stage detection and pacenote loading benchmark')
+    parser.add_argument('--output', help='JSON results file, stdout if omitted')
+    args = parser.parse_args()
+
+    results = {'detect_stage_us': {}, 'read_pacenotes_us': {}}
+    for count in STAGE_COUNTS:
+        results['detect_stage_us'][str(count)] = bench_detect(count)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for count in NOTE_COUNTS:
+            results['read_pacenotes_us'][str(count)] = bench_read(tmp_dir, count)
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
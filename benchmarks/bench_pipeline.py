@@ -0,0 +1,143 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# End-to-end latency and throughput of the pacenote pipeline, no game or sound card needed.
+# Usage: python benchmarks/bench_pipeline.py [--rate 60] [--speed variable] [--density 40]
+#                                            [--duration 10] [--output results.json]
+
+import argparse
+import socket
+import struct
+import tempfile
+import time
+
+from synthetic import SPEED_PROFILES, blast, generate, make_stage, null_sink, percentiles, NullSoundBank, \
+    write_results
+from control import ControlChannel, QUIT
+from pipeline import ON_STAGE
+from playback import Player
+from reader import Reader
+
+
+def start_reader(port, pace_path, stages, drain=False, trigger_mode='distance'):
+    config = {'server': ('127.0.0.1', port), 'pace_path': pace_path, 'delay': 100, 'volume': 0,
+              'countdown': False, 'drain': drain, 'trigger_mode': trigger_mode}
+    control = ControlChannel()
+    player = Player(NullSoundBank(), maxsize=64, sink=null_sink)
+    reader = Reader(config, stages, [], {}, control, lambda topic, **kwargs: None, player=player)
+    reader.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+    return reader, control, config['server']
+
+
+def stop_reader(reader, control):
+    control.send(QUIT)
+    reader.join(2)
+    control.close()
+
+
+def enter_stage(reader, sender, server, start_packet):
+    while reader.pipeline.state not in ON_STAGE:  # Detect stage and load pacenotes.
+        sender.sendto(start_packet, server)
+        time.sleep(0.01)
+
+
+# Paced stage run, latencies of each step in milliseconds.
+def run_latency(args, pace_path, stages):
+    packets = generate(args.rate, args.speed, limit=int(args.duration * args.rate))
+    reader, control, server = start_reader(args.port, pace_path, stages, args.drain, args.trigger_mode)
+    pipeline, player = reader.pipeline, reader.player
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    enter_stage(reader, sender, server, packets[0])
+
+    sent, decoded, triggered = {}, {}, []
+    current = [0.0]
+    feed, play_phrase = pipeline.feed, player.play_phrase
+
+    def timed_feed(udp_data):  # Called by Reader right after decoding.
+        current[0] = decoded[udp_data.total_time] = time.perf_counter()
+        feed(udp_data)
+
+    def timed_play(phrase, volume, at=None):
+        triggered.append(time.perf_counter() - current[0])
+        return play_phrase(phrase, volume, at)
+
+    pipeline.feed, player.play_phrase = timed_feed, timed_play
+    player.stats.clear()
+    period = 1.0 / args.rate
+    next_send = time.perf_counter()
+    for payload in packets[1:]:
+        delay = next_send - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        sent[struct.unpack_from('<f', payload)[0]] = time.perf_counter()
+        sender.sendto(payload, server)
+        next_send += period
+    time.sleep(0.2)
+    stop_reader(reader, control)
+    sender.close()
+
+    to_decode = [decoded[key] - sent[key] for key in sent if key in decoded]
+    return {
+        'packets_sent': len(sent),
+        'packets_decoded': len(to_decode),
+        'packets_coalesced': reader.decoder.coalesced,
+        'phrases_dropped': player.dropped,
+        'packet_to_decode_ms': percentiles(to_decode),
+        'decode_to_trigger_ms': percentiles(triggered),
+        'trigger_to_playback_ms': percentiles(player.lag()),
+    }
+
+
+# Unpaced stream, packets per second the Reader sustains.
+def run_throughput(args, pace_path, stages):
+    packets = generate(1000, 'fast')
+    reader, control, server = start_reader(args.port + 1, pace_path, stages, trigger_mode=args.trigger_mode)
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    enter_stage(reader, sender, server, packets[0])
+    payloads = packets[1:-1]
+    cpu, wall = blast(reader.pipeline, sender, server, payloads)
+    stop_reader(reader, control)
+    sender.close()
+    return {'packets': len(payloads), 'packets_per_s': len(payloads) / wall,
+            'cpu_us_per_packet': cpu / len(payloads) * 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pacenote pipeline benchmark')
+    parser.add_argument('--rate', type=int, default=60, help='telemetry packets per second')
+    parser.add_argument('--speed', choices=sorted(SPEED_PROFILES), default='variable')
+    parser.add_argument('--density', type=int, default=40, help='pacenotes per km')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds of paced telemetry')
+    parser.add_argument('--drain', action='store_true', help='latest-packet-wins socket draining')
+    parser.add_argument('--trigger-mode', choices=('distance', 'time'), default='distance')
+    parser.add_argument('--port', type=int, default=20780)
+    parser.add_argument('--output', help='JSON results file, stdout if omitted')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pace_path, stages = make_stage(tmp_dir, args.density)
+        results = {
+            'config': vars(args),
+            'latency': run_latency(args, pace_path, stages),
+            'throughput': run_throughput(args, pace_path, stages),
+        }
+    write_results(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Synthetic telemetry, stages and a null audio sink for benchmarks.
+
+import json
+import math
+import os
+import struct
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stages import StageIndex
+
+STAGE_LENGTH = 10000.0
+WORDS = ('left', 'right', '3', '4', '5', 'into', 'over', 'crest', 'long', 'tightens')
+
+# Speed in km/h at time t in seconds.
+SPEED_PROFILES = {
+    'constant': lambda t: 120.0,
+    'variable': lambda t: 140.0 + 60.0 * math.sin(t / 4.0),
+    'slow': lambda t: 40.0,
+    'fast': lambda t: 200.0,
+}
+
+
+def make_packet(total_time, lap_time, dist, stage_length=STAGE_LENGTH, speed=0.0, pos_y=0.0, curr_lap=0.0):
+    fields = [0.0] * 66
+    fields[0] = total_time
+    fields[1] = lap_time
+    fields[2] = dist
+    fields[5] = pos_y
+    fields[7] = speed / 3.6  # m/s
+    fields[59] = curr_lap
+    fields[60] = 1.0  # total_laps
+    fields[61] = stage_length
+    return struct.pack('<66f', *fields)
+
+
+# Packets of one stage run: car at the start line, then running until finish or limit.
+def generate(rate=60, speed='variable', stage_length=STAGE_LENGTH, limit=None):
+    profile = SPEED_PROFILES[speed]
+    packets = [make_packet(1.0, 0.0, 0.0, stage_length)]
+    t = dist = 0.0
+    while dist < stage_length and (limit is None or len(packets) <= limit):
+        t += 1.0 / rate
+        dist += profile(t) / 3.6 / rate
+        packets.append(make_packet(1.0 + t, t, min(dist, stage_length - 1), stage_length, profile(t)))
+    packets.append(make_packet(1.0 + t, t, stage_length, stage_length, curr_lap=1.0))
+    return packets
+
+
+# Pacenotes file with density notes per km, return pace_path and stage index.
+def make_stage(tmp_dir, density=40, stage_length=STAGE_LENGTH, name='Bench', folder='bench'):
+    pace_path = os.path.join(tmp_dir, 'pacenotes')
+    os.makedirs(os.path.join(pace_path, folder), exist_ok=True)
+    notes = int(stage_length / 1000 * density)
+    with open(os.path.join(pace_path, folder, name + '.txt'), 'w') as f:
+        for i in range(1, notes + 1):
+            words = (WORDS[i % len(WORDS)], WORDS[(i * 7) % len(WORDS)])
+            f.write('{},{}\n'.format(i * int(stage_length) // (notes + 1), ' '.join(words)))
+    stages = StageIndex()
+    stages.add(stage_length, 0, name, folder)
+    return pace_path, stages
+
+
+class NullSound:
+    raw_data = b''
+    frame_rate = 44100
+    sample_width = 2
+    channels = 1
+    duration_seconds = 0.0
+
+    def __add__(self, gain):
+        return self
+
+
+# Sound bank answering every name, for the null sink.
+class NullSoundBank(dict):
+    def __missing__(self, key):
+        return NullSound()
+
+    def __contains__(self, key):
+        return True
+
+
+def null_sink(sound):
+    pass
+
+
+def wait_for(condition, timeout=10.0):
+    end = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > end:
+            raise RuntimeError('Reader did not keep up')
+        time.sleep(0.0005)
+
+
+# Send payloads in bursts the socket buffer can hold, return process CPU seconds and wall seconds.
+def blast(pipeline, sender, server, payloads, burst=100):
+    start = pipeline.packets
+    cpu, wall = time.process_time(), time.perf_counter()
+    for i in range(0, len(payloads), burst):
+        for payload in payloads[i:i + burst]:
+            sender.sendto(payload, server)
+        count = min(i + burst, len(payloads))
+        wait_for(lambda: pipeline.packets - start >= count)
+    return time.process_time() - cpu, time.perf_counter() - wall
+
+
+def percentiles(samples, scale=1000.0):
+    if not samples:
+        return {'count': 0}
+    samples = sorted(samples)
+    pick = lambda p: samples[min(len(samples) - 1, int(p / 100.0 * len(samples)))] * scale
+    return {'count': len(samples), 'p50': pick(50), 'p90': pick(90), 'p99': pick(99), 'max': samples[-1] * scale}
+
+
+def write_results(results, output):
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
@@ -0,0 +1,91 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import time
+from threading import Event, Lock, Thread
+
+
+# Topics where only the newest value matters, with how a newer value replaces an undelivered one.
+LATEST = {
+    'get_dist': lambda old, new: dict(new, arg2=old['arg2']),  # Keep the distance the GUI saw last.
+    'get_pause': lambda old, new: new,
+    'get_progress': lambda old, new: new,
+}
+
+
+# Reader messages to the GUI, latest value per topic at a limited frame rate
+class UIBridge(Thread):
+    def __init__(self, post, rate=15.0, latest=LATEST):
+        Thread.__init__(self)
+
+        self.post = post  # post(updates) hands [(topic, kwargs)] over to the GUI thread.
+        self.interval = 1.0 / rate
+        self.latest = latest
+        self.slots = {}  # {topic: kwargs} not delivered yet.
+        self.delivered = {}  # {topic: kwargs} last delivered.
+        self.lock = Lock()
+        self.changed = Event()
+        self.received = 0
+        self.merged = 0  # Updates replaced by a newer one before delivery.
+        self.unchanged = 0  # Updates equal to the delivered value.
+        self.frames = 0  # GUI wakeups for latest values.
+
+        self.running = True
+        self.setDaemon(True)
+        self.start()
+
+    # Drop-in for notify(topic, **kwargs), other topics are posted at once.
+    def notify(self, topic, **kwargs):
+        self.received += 1
+        merge = self.latest.get(topic)
+        if merge is None:
+            self.post([(topic, kwargs)])
+            return
+        with self.lock:
+            old = self.slots.get(topic)
+            if old is not None:
+                self.merged += 1
+                kwargs = merge(old, kwargs)
+            self.slots[topic] = kwargs
+        self.changed.set()
+
+    def run(self):
+        while self.running:
+            self.changed.wait()
+            self.changed.clear()
+            with self.lock:
+                slots, self.slots = self.slots, {}
+            updates = []
+            for topic, kwargs in slots.items():
+                if self.delivered.get(topic) == kwargs:
+                    self.unchanged += 1
+                    continue
+                self.delivered[topic] = kwargs
+                updates.append((topic, kwargs))
+            if updates and self.running:
+                self.post(updates)
+                self.frames += 1
+                time.sleep(self.interval)
+
+    def stats(self):
+        return {'received': self.received, 'merged': self.merged, 'unchanged': self.unchanged,
+                'frames': self.frames}
+
+    def stop(self):
+        self.running = False
+        self.changed.set()
@@ -0,0 +1,64 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import socket
+from collections import deque
+
+
+# Control message kinds.
+QUIT = 'quit'
+RESET = 'reset'
+DELAY = 'delay'
+VOLUME = 'volume'
+PACENOTES = 'pacenotes'
+
+
+# Control messages for the Reader, wakes it through its selector
+class ControlChannel:
+    def __init__(self):
+        self.messages = deque()
+        self.rsock, self.wsock = socket.socketpair()
+        self.rsock.setblocking(False)
+        self.wsock.setblocking(False)
+
+    def fileno(self):
+        return self.rsock.fileno()
+
+    # Safe to call from any thread, never blocks.
+    def send(self, kind, value=None):
+        self.messages.append((kind, value))
+        try:
+            self.wsock.send(b'\0')
+        except (BlockingIOError, InterruptedError):
+            pass  # Reader is already woken up.
+
+    # Return pending messages in order of sending.
+    def receive(self):
+        try:
+            while self.rsock.recv(512):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+        messages = []
+        while self.messages:
+            messages.append(self.messages.popleft())
+        return messages
+
+    def close(self):
+        self.rsock.close()
+        self.wsock.close()
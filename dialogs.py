@@ -0,0 +1,290 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Windows opened on demand, imported on first use to keep them off the startup path.
+
+import os
+import sys
+import wx
+import wx.adv
+import wx.aui
+import wx.lib.intctrl as ict
+import wx.lib.agw.flatnotebook as fnb
+from wx.lib.wordwrap import wordwrap
+
+
+class TaskBar(wx.adv.TaskBarIcon):
+    def __init__(self, frame):
+        wx.adv.TaskBarIcon.__init__(self)
+
+        self.frame = frame
+        self.SetIcon(frame.icon, frame.title)
+        self.Bind(wx.EVT_MENU, self.on_show, id=1)
+        self.Bind(wx.EVT_MENU, self.on_hide, id=2)
+        self.Bind(wx.EVT_MENU, self.on_close, id=3)
+
+    def CreatePopupMenu(self):
+        menu = wx.Menu()
+        menu.Append(1, 'Show')
+        menu.Append(2, 'Hide')
+        menu.Append(3, 'Close')
+        return menu
+
+    def on_show(self, event):
+        if not self.frame.IsShown():
+            self.frame.Show()
+
+    def on_hide(self, event):
+        if self.frame.IsShown():
+            self.frame.Hide()
+
+    def on_close(self, event):
+        self.frame.Close()
+
+
+class HandInput(wx.Dialog):  # not used at the moment
+    def __init__(self, parent):
+        wx.Dialog.__init__(self, parent)
+
+        self.parent = parent
+        self.SetSize(wx.Size(180, 80))
+        self.SetTitle('DiRTy Handbrake')
+        self.SetIcon(self.parent.icon)
+        self.Center(wx.BOTH)
+
+        panel = wx.Panel(self, name='panel_handbrake')
+        box_main = wx.BoxSizer(wx.HORIZONTAL)
+
+        label_handbrake = wx.StaticText(panel, 0, 'APPLY HANDBRAKE')
+        box_main.Add(label_handbrake, 0, wx.ALIGN_CENTER_HORIZONTAL | wx.ALL, 15)
+        panel.SetSizer(box_main)
+
+        # self.SetReturnCode()
+
+
+class TextDropTarget(wx.TextDropTarget):
+    def __init__(self, target):
+        wx.TextDropTarget.__init__(self)
+        self.target = target
+
+    def OnDropText(self, x, y, data):
+        self.target.InsertItem(sys.maxsize, data)
+        return True
+
+
+class Settings(wx.Dialog):
+    def __init__(self, parent):
+        wx.Dialog.__init__(self, parent)
+
+        self.parent = parent
+        self.SetSize(wx.Size(260, 340))
+        self.SetTitle('DiRTy Pacenotes - Service Area')
+        self.SetIcon(self.parent.icon)
+        self.Center(wx.BOTH)
+
+        panel = wx.Panel(self, name='panel_settings')
+        box_main = wx.BoxSizer(wx.VERTICAL)
+
+        box_server = wx.StaticBox(panel, 0, 'UDP SERVER')
+        sbs_server = wx.StaticBoxSizer(box_server)
+
+        label_ip = wx.StaticText(panel, 0, 'IP')
+        self.ip_value = wx.TextCtrl(panel, size=wx.Size(60, 23))
+        self.ip_value.SetValue(self.parent.ip)
+        sbs_server.Add(label_ip, 0, wx.ALIGN_CENTER_VERTICAL | wx.LEFT, 10)
+        sbs_server.Add(self.ip_value, 0, wx.ALL, 10)
+        label_port = wx.StaticText(panel, 0, 'Port')
+        self.port_value = ict.IntCtrl(panel, size=wx.Size(45, 23), min=10000, max=99999, value=self.parent.port,
+                                      limited=True, allow_none=True)
+        self.port_value.SetValue(self.parent.port)
+        sbs_server.Add(label_port, 0, wx.ALIGN_CENTER_VERTICAL)
+        sbs_server.Add(self.port_value, 0, wx.ALL, 10)
+
+        box_co_driver = wx.StaticBox(panel, 0, 'CO-DRIVER')
+        sbs_co_driver = wx.StaticBoxSizer(box_co_driver)
+
+        co_drivers = os.listdir('co-drivers')
+        self.combo_co_driver = wx.ComboBox(panel, choices=co_drivers, style=wx.CB_READONLY)
+        self.combo_co_driver.SetValue(self.parent.co_driver)
+        self.combo_co_driver.SetFocus()
+        sbs_co_driver.Add(self.combo_co_driver, 0, wx.ALL, 10)
+
+        box_countdown = wx.BoxSizer(wx.HORIZONTAL)
+        self.count_check = wx.CheckBox(panel, 0, 'COUNTDOWN')
+        self.count_check.SetValue(bool(self.parent.countdown))
+        box_countdown.Add(self.count_check, 0, wx.ALL, 10)
+
+        '''
+        box_handbrake = wx.StaticBox(panel, 0, 'HANDBRAKE')
+        sbs_handbrake = wx.StaticBoxSizer(box_handbrake)
+
+        button_handbrake = wx.Button(panel, wx.ID_ANY, 'CHANGE')
+        button_handbrake.Bind(wx.EVT_BUTTON, self.parent.on_change_handbrake)
+        self.handbrake_value = wx.TextCtrl(panel, size=wx.Size(60, 23))
+        self.handbrake_value.SetValue(self.parent.handbrake)
+        sbs_handbrake.Add(self.handbrake_value, 0, wx.ALL, 10)
+        sbs_handbrake.Add(button_handbrake, 0, wx.ALIGN_CENTER_VERTICAL | wx.LEFT, 10)
+        '''
+        bs_buttons = wx.BoxSizer(wx.HORIZONTAL)
+        button_reload = wx.Button(panel, id=2, label='SAVE and RELOAD')
+        button_reload.Bind(wx.EVT_BUTTON, self.parent.on_reload)
+
+        bs_buttons.Add(button_reload, 0)
+
+        box_main.Add(sbs_server, 0, wx.ALL, 20)
+        box_main.Add(sbs_co_driver, 0, wx.LEFT, 20)
+        box_main.Add(box_countdown, 0, wx.LEFT, 20)
+        # box_main.Add(sbs_handbrake, 0, wx.LEFT | wx.RIGHT, 20)
+        box_main.Add(bs_buttons, 0, wx.ALIGN_CENTER_HORIZONTAL | wx.TOP, 20)
+        panel.SetSizer(box_main)
+
+
+class Creator(wx.Dialog):
+    def __init__(self, parent):
+        wx.Dialog.__init__(self, parent)
+
+        self.parent = parent
+        self.SetSize(wx.Size(640, 480))
+        self.SetTitle('DiRTy Pacenotes - ' + self.parent.co_driver)
+        self.SetBackgroundColour('light grey')
+        self.SetIcon(self.parent.icon)
+        self.Center(wx.BOTH)
+        self.SetWindowStyle(wx.DEFAULT_DIALOG_STYLE)
+
+        self.dict_list_c = {}
+        self.cat_list_c = []
+        self.sound_list_c = []
+        self.audio_list_c = []
+        self.selection_left = []
+        self.selection_right = []
+
+        panel_sizer = wx.BoxSizer(wx.HORIZONTAL)
+
+        # Left side
+        box_left = wx.BoxSizer(wx.HORIZONTAL)
+        self.tabs_left = fnb.FlatNotebook(self, agwStyle=fnb.FNB_HIDE_ON_SINGLE_TAB)
+        box_left.Add(self.tabs_left, 1, wx.EXPAND)
+
+        # Right side
+        box_right = wx.BoxSizer(wx.VERTICAL)
+
+        # Panel with buttons (right top)
+        box_but_top = wx.BoxSizer(wx.HORIZONTAL)
+        box_but_bot = wx.BoxSizer(wx.HORIZONTAL)
+
+        self.button_in = wx.Button(self, wx.ID_ANY, label=u'IN')
+        self.button_out = wx.Button(self, wx.ID_ANY, label=u'OUT')
+        button_add = wx.Button(self, wx.ID_ANY, label='ADD CATEGORY')
+        button_reload = wx.Button(self, id=1, label='SAVE and RELOAD')
+        button_reset = wx.Button(self, wx.ID_ANY, label='RESET SOUNDS')
+
+        self.button_in.Disable()
+        self.button_out.Disable()
+
+        box_but_top.Add(self.button_in, 0, wx.ALL, 5)
+        box_but_top.Add(self.button_out, 0, wx.ALL, 5)
+        box_but_top.Add(button_add, 0, wx.ALL, 5)
+        box_but_bot.Add(button_reset, 0, wx.ALL, 5)
+        box_but_bot.Add(button_reload, 0, wx.ALL, 5)
+
+        self.button_in.Bind(wx.EVT_BUTTON, self.parent.sounds_in)
+        self.button_out.Bind(wx.EVT_BUTTON, self.parent.sounds_out)
+        button_reset.Bind(wx.EVT_BUTTON, self.parent.reset_sounds)
+        button_reload.Bind(wx.EVT_BUTTON, self.parent.on_reload)
+        button_add.Bind(wx.EVT_BUTTON, self.parent.add_category)
+
+        # Panel with categories (right bottom)
+        box_cat = wx.BoxSizer(wx.HORIZONTAL)
+        self.tabs_right = wx.aui.AuiNotebook(self, style=wx.aui.AUI_NB_WINDOWLIST_BUTTON | wx.aui.AUI_NB_TAB_MOVE |
+                                             wx.aui.AUI_NB_SCROLL_BUTTONS | wx.aui.AUI_NB_CLOSE_BUTTON)
+        self.tabs_right.Bind(wx.aui.EVT_AUINOTEBOOK_PAGE_CLOSE, self.parent.on_tab_close)
+        box_cat.Add(self.tabs_right, 1, wx.EXPAND)
+
+        box_right.Add(box_but_top, 0, wx.ALIGN_CENTER_HORIZONTAL)
+        box_right.Add(box_cat, 2, wx.EXPAND | wx.ALL, 5)
+        box_right.Add(box_but_bot, 0, wx.ALIGN_CENTER_HORIZONTAL)
+
+        # Add sizers to panel_sizer.
+        panel_sizer.Add(box_left, 1, wx.EXPAND | wx.ALL, 10)
+        panel_sizer.Add(box_right, 0, wx.EXPAND | wx.ALL, 10)
+        self.SetSizer(panel_sizer)
+
+        self.create_audio()
+        self.create_sounds()
+
+    # Define methods.
+    def create_audio(self):
+        self.tabs_left.DeleteAllPages()
+        for s in os.listdir(self.parent.sound_path):
+            (name, ext) = s.split('.')
+            self.audio_list_c.append(name)
+        for sublist in list(self.parent.sound_list.values()):
+            for item in sublist:
+                self.sound_list_c.append(item)
+        audio_list_final = self.parent.diff(self.audio_list_c, self.sound_list_c)
+        audio_list_final.sort()
+        tab_left = wx.Panel(self.tabs_left, style=wx.BORDER_NONE, id=1)
+        tab_left.SetBackgroundColour('white')
+        tab_left.SetCursor(wx.Cursor(wx.CURSOR_HAND))
+        list_box_left = wx.ListBox(tab_left, choices=audio_list_final, style=wx.LB_MULTIPLE)
+        h_box_tabs = wx.BoxSizer(wx.HORIZONTAL)
+        h_box_tabs.Add(list_box_left, 0, wx.EXPAND)
+        tab_left.SetSizer(h_box_tabs)
+        list_box_left.Bind(wx.EVT_LISTBOX, self.parent.on_listbox_left)
+        self.tabs_left.AddPage(tab_left, 'audio')
+
+    def create_sounds(self):
+        self.tabs_right.DeleteAllPages()
+        for category, sounds_list in list(self.parent.sound_list.items()):
+            tab_right = wx.Panel(self.tabs_right, style=wx.TAB_TRAVERSAL | wx.BORDER_NONE, name=category, id=2)
+            tab_right.SetBackgroundColour('white')
+            tab_right.SetCursor(wx.Cursor(wx.CURSOR_HAND))
+            list_box_right = wx.ListBox(tab_right, choices=sounds_list, style=wx.LB_MULTIPLE)
+            h_box_tabs = wx.BoxSizer(wx.HORIZONTAL)
+            h_box_tabs.Add(list_box_right, 0, wx.EXPAND)
+            tab_right.SetSizer(h_box_tabs)
+            list_box_right.Bind(wx.EVT_LISTBOX, self.parent.on_listbox_right)
+            self.tabs_right.AddPage(tab_right, category)
+
+
+def show_about(parent, img_path):
+    description = wordwrap('DiRTy Pacenotes lets you create your own pacenotes\n'
+                           'for DiRT Rally and DiRT Rally 2.0 stages.\n'
+                           'These custom pacenotes will be read by the co-driver of your choice.\n', 420,
+                           wx.ClientDC(parent))
+
+    licence = wordwrap('Licensed under the Apache License, Version 2.0 (the "License");\n'
+                       'you may not use this software except in compliance with the License.\n'
+                       'You may obtain a copy of the License at\n'
+                       'http://www.apache.org/licenses/LICENSE-2.0\n'
+                       'Unless required by applicable law or agreed to in writing,\n'
+                       'software distributed under the License is distributed on an "AS IS" BASIS,\n'
+                       'WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,\n'
+                       'either express or implied. See the License for the specific language\n'
+                       'governing permissions and limitations under the License.', 420, wx.ClientDC(parent))
+    icon = wx.Icon(os.path.join(img_path, 'icon.png'))
+
+    info = wx.adv.AboutDialogInfo()
+
+    info.SetName('DiRTy Pacenotes')
+    info.SetVersion('2.5.1')
+    info.SetIcon(icon)
+    info.SetDescription(description)
+    info.SetCopyright('(C) 2017 - 2019 Palo Samo')
+    info.SetLicence(licence)
+    wx.adv.AboutBox(info)
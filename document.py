@@ -0,0 +1,145 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from collections import namedtuple, OrderedDict
+from sortedcontainers import SortedDict
+
+
+# Change kinds, row is the index of the pacenote in distance order.
+INSERTED = 'inserted'  # Row added at row.
+UPDATED = 'updated'  # Pacenote of row changed.
+TICKED = 'ticked'  # Tick of row changed.
+DELETED = 'deleted'  # Row removed from row.
+RELOADED = 'reloaded'  # Every row changed, row is None.
+
+Change = namedtuple('Change', 'kind row dist')
+
+
+# Pacenotes of one stage sorted by distance, with ticked rows and change notifications
+class PacenoteDocument:
+    def __init__(self):
+        self.notes = SortedDict()  # {dist: pacenote}
+        self.ticked = set()  # Distances of ticked rows.
+        self.listeners = []
+
+    def __len__(self):
+        return len(self.notes)
+
+    def __contains__(self, dist):
+        return dist in self.notes
+
+    def __iter__(self):
+        return iter(self.notes)
+
+    def __getitem__(self, dist):
+        return self.notes[dist]
+
+    def get(self, dist, default=''):
+        return self.notes.get(dist, default)
+
+    def items(self):
+        return self.notes.items()
+
+    # Ordered {dist: pacenote} for the Reader and for writing files.
+    def to_dict(self):
+        return OrderedDict(self.notes.items())
+
+    # Call listener(changes) with a list of Change after every edit.
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def notify(self, changes):
+        if changes:
+            for listener in self.listeners:
+                listener(changes)
+
+    # Row of dist, -1 if there is no pacenote at dist.
+    def index(self, dist):
+        row = self.notes.bisect_left(dist)
+        if row < len(self.notes) and self.notes.keys()[row] == dist:
+            return row
+        return -1
+
+    def dist_at(self, row):
+        return self.notes.keys()[row]
+
+    # Replace all pacenotes, from {dist: pacenote} or lines 'dist,pacenote'.
+    def load(self, pacenotes):
+        self.notes.clear()
+        self.ticked.clear()
+        if isinstance(pacenotes, dict):
+            self.notes.update((int(dist), pace.strip('\n')) for dist, pace in pacenotes.items())
+        else:
+            for line in pacenotes:
+                if line and line.split():
+                    lis = line.partition(',')  # tuple
+                    self.notes[int(lis[0])] = lis[2].strip('\n')
+        self.notify([Change(RELOADED, None, None)])
+
+    def clear(self):
+        self.load({})
+
+    # Add or replace pacenote at dist.
+    def set(self, dist, pace):
+        exists = dist in self.notes
+        self.notes[dist] = pace.strip('\n')
+        self.notify([Change(UPDATED if exists else INSERTED, self.index(dist), dist)])
+
+    def delete(self, dists):
+        changes = []
+        for dist in sorted(dists, reverse=True):  # Last rows first, rows of the other changes stay valid.
+            if dist in self.notes:
+                changes.append(Change(DELETED, self.index(dist), dist))
+                del self.notes[dist]
+                self.ticked.discard(dist)
+        self.notify(changes)
+
+    def delete_ticked(self):
+        self.delete(list(self.ticked))
+
+    # Move pacenote to another distance, replacing any pacenote there.
+    def move(self, old_dist, dist):
+        if old_dist == dist or old_dist not in self.notes:
+            return
+        changes = [Change(DELETED, self.index(old_dist), old_dist)]
+        pace = self.notes.pop(old_dist)
+        ticked = old_dist in self.ticked
+        self.ticked.discard(old_dist)
+        exists = dist in self.notes
+        self.notes[dist] = pace
+        if ticked:
+            self.ticked.add(dist)
+        changes.append(Change(UPDATED if exists else INSERTED, self.index(dist), dist))
+        self.notify(changes)
+
+    def tick(self, dist, checked):
+        if dist not in self.notes:
+            return
+        if checked:
+            self.ticked.add(dist)
+        else:
+            self.ticked.discard(dist)
+        self.notify([Change(TICKED, self.index(dist), dist)])
+
+    def tick_all(self, checked):
+        changes = [Change(TICKED, self.index(dist), dist) for dist in (self.notes if checked else self.ticked)]
+        if checked:
+            self.ticked.update(self.notes)
+        else:
+            self.ticked.clear()
+        self.notify(changes)
@@ -0,0 +1,105 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import asyncio
+from pipeline import Pipeline, read_pacenotes, IDLE, PACENOTE_ERRORS
+from reader import Session, make_socket
+from telemetry import Decoder
+
+
+class TelemetryProtocol(asyncio.DatagramProtocol):
+    def __init__(self, engine):
+        self.engine = engine
+
+    def datagram_received(self, data, addr):
+        self.engine.datagram(data)
+
+    def error_received(self, exc):
+        pass  # ICMP errors on Windows, telemetry keeps coming.
+
+
+# UDP server running the pipeline on an asyncio event loop
+class AsyncReader(Session):
+    def __init__(self, config, stages, snd_files, sound_bank, control, notify, timeout=5.0, player=None,
+                 banks=None):
+        Session.__init__(self, config, snd_files, sound_bank, notify, player, banks)
+
+        self.control = control
+        self.timeout = timeout  # Seconds without telemetry until the stage is dropped.
+        self.last_packet = 0.0
+        self.watchdog = None
+
+        self.sock = make_socket(config['server'])
+        self.sock.setblocking(False)
+        self.decoder = Decoder()
+        self.loop = asyncio.new_event_loop()
+
+        self.pipeline = Pipeline(config, stages, self.player, notify, load=self.load_pacenotes)
+
+        self.setDaemon(True)
+        self.start()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.main())
+        finally:
+            self.close()
+            self.loop.close()
+
+    async def main(self):
+        self.sound_arena = await self.loop.run_in_executor(None, self.load_bank)
+        transport, protocol = await self.loop.create_datagram_endpoint(lambda: TelemetryProtocol(self),
+                                                                       sock=self.sock)
+        self.watchdog = self.loop.call_later(self.timeout, self.check_connection)
+        try:
+            await self.receive_control()
+        finally:
+            self.watchdog.cancel()
+            transport.close()
+
+    def datagram(self, data):
+        self.last_packet = self.loop.time()
+        if self.recorder:
+            self.recorder.write(data)
+        udp_data = self.decoder.decode(len(data), data)
+        if udp_data is not None:  # skip packets without stage fields
+            self.pipeline.feed(udp_data)
+
+    async def receive_control(self):
+        while self.pipeline.running:
+            await self.loop.sock_recv(self.control.rsock, 512)
+            for kind, value in self.control.receive():
+                self.pipeline.apply(kind, value)
+
+    # Drop the stage when telemetry stops, e.g. game quit to desktop.
+    def check_connection(self):
+        if self.pipeline.state != IDLE and self.loop.time() - self.last_packet > self.timeout:
+            self.pipeline.state = IDLE
+        self.watchdog = self.loop.call_later(self.timeout / 2, self.check_connection)
+
+    # Read pacenotes file without blocking the event loop, None if it cannot be read like pipeline.load_pacenotes.
+    def load_pacenotes(self, stage_file, callback):
+        def done(future):
+            try:
+                dic_pacenotes = future.result()
+            except PACENOTE_ERRORS:
+                dic_pacenotes = None
+            callback(dic_pacenotes)
+
+        self.loop.run_in_executor(None, read_pacenotes, stage_file).add_done_callback(done)
@@ -0,0 +1,235 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+# Pacenote caller without the GUI, for rigs running next to the game.
+# Usage: python headless.py [--config data/config.ini] [--co-driver NAME] [--events log|json|none] ...
+#        python headless.py --rig rig1:20777 --rig rig2:20778:CO_DRIVER ...
+# Commands on stdin: [rig] delay N, [rig] volume N, [rig] reset, [rig] status, [rig] quit.
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from threading import Lock
+from startup import StartupReport  # Before the slow imports, its clock starts on import.
+from configobj import ConfigObj
+from control import RESET, DELAY, VOLUME
+from rigs import MultiRig, rig_config
+from stages import StageIndex
+
+# Defaults of config.ini, same as the GUI writes on first run.
+DEFAULTS = {
+    'ip': '127.0.0.1',
+    'port': '20777',
+    'co_driver': '',
+    'delay': '200',
+    'volume': '5',
+    'countdown': 'True',
+    'drain': 'False',
+    'backend': 'thread',
+    'record': '',
+    'stage_tolerance': '0.01',
+    'phrase_cache_mb': '64',
+    'sound_bank': 'eager',
+    'sound_bank_mb': '128',
+    'audio_output': 'play',
+    'trigger_mode': 'distance',
+    'lead_time': '1.0',
+}
+QUIET = ('get_dist', 'get_pause', 'get_progress')  # Sent per packet or per sound, logged with --verbose.
+
+
+# Events as text lines
+class LogSink:
+    def __init__(self, stream=sys.stderr, verbose=False):
+        self.stream = stream
+        self.verbose = verbose
+        self.lock = Lock()  # Reader and stdin threads both report.
+
+    def __call__(self, topic, **kwargs):
+        if topic in QUIET and not self.verbose:
+            return
+        args = ' '.join('{}={}'.format(key, value) for key, value in sorted(kwargs.items()))
+        with self.lock:
+            self.stream.write('{:.3f} {} {}\n'.format(time.time(), topic, args))
+            self.stream.flush()
+
+
+# Events as JSON lines, for a supervising process
+class JsonSink(LogSink):
+    def __call__(self, topic, **kwargs):
+        if topic in QUIET and not self.verbose:
+            return
+        line = json.dumps(dict(kwargs, topic=topic, time=time.time()))
+        with self.lock:
+            self.stream.write(line + '\n')
+            self.stream.flush()
+
+
+def null_sink(topic, **kwargs):
+    pass
+
+
+EVENT_SINKS = {
+    'log': lambda verbose: LogSink(sys.stderr, verbose),
+    'json': lambda verbose: JsonSink(sys.stdout, verbose),
+    'none': lambda verbose: null_sink,
+}
+
+
+def read_config(config_ini):
+    config = dict(DEFAULTS)
+    if os.path.exists(config_ini):
+        config.update(ConfigObj(config_ini))
+    return config
+
+
+# Reader config from config.ini values and command line overrides.
+def reader_config(config, app_path):
+    co_driver = config['co_driver']
+    return {'server': (config['ip'], int(config['port'])),
+            'pace_path': os.path.join(app_path, 'co-drivers', co_driver, 'pacenotes'),
+            'delay': int(config['delay']) - 100, 'volume': int(config['volume']),
+            'countdown': config['countdown'] == 'True', 'drain': config['drain'] == 'True',
+            'record': config['record'], 'co_driver': co_driver,
+            'phrase_cache_mb': int(config['phrase_cache_mb']), 'sound_bank': config['sound_bank'],
+            'sound_bank_mb': int(config['sound_bank_mb']), 'audio_output': config['audio_output'],
+            'trigger_mode': config['trigger_mode'], 'lead_time': float(config['lead_time']),
+            'sound_cache': os.path.join(app_path, 'data', 'cache', co_driver)}
+
+
+# Rigs [(name, config)] from --rig name:port[:co_driver] values, one rig 'main' from config.ini without them.
+def parse_rigs(specs, config):
+    if not specs:
+        return [('main', config)]
+    rigs = []
+    for spec in specs:
+        name, _, rest = spec.partition(':')
+        port, _, co_driver = rest.partition(':')
+        int(port)  # ValueError for the parser.
+        rigs.append((name, dict(config, port=port, co_driver=co_driver or config['co_driver'])))
+    return rigs
+
+
+# Start a Reader thread per rig, rigs with the same co-driver share its sound bank.
+def start(rigs, app_path, notify, report, backend_name='thread'):
+    stages = StageIndex(float(rigs[0][1]['stage_tolerance']))
+    stages.read(os.path.join(app_path, 'data', 'stages.csv'))
+    if stages.skipped:
+        notify('stages_skipped', arg=stages.skipped)
+    report.mark('stages read')
+    if backend_name == 'asyncio':  # Only one backend is imported.
+        backend = report.load('engine').AsyncReader
+    else:
+        backend = report.load('reader').Reader
+    multi_rig = MultiRig(stages, notify, backend)
+    for name, config in rigs:
+        snd_files = glob.glob(os.path.join(app_path, 'co-drivers', config['co_driver'], 'sounds', '*'))
+        config = reader_config(config, app_path)
+        multi_rig.add(name, rig_config(name, config) if len(rigs) > 1 else config, snd_files)
+    report.mark('readers started')
+    return multi_rig
+
+
+# Apply one command line from stdin, '[rig] command', commands without a rig go to all rigs.
+# Return False once no rig is left.
+def command(line, multi_rig, notify):
+    words = line.split()
+    name = None
+    if words and words[0] in multi_rig:
+        name, words = words[0], words[1:]
+    if not words:
+        return True
+    kind, args = words[0].lower(), words[1:]
+    try:
+        if kind == 'quit':
+            for rig_name in ([name] if name else list(multi_rig.rigs)):
+                multi_rig.remove(rig_name)
+                notify('stopped', rig=rig_name)
+            return bool(multi_rig.rigs)
+        elif kind == 'reset':
+            multi_rig.send(name, RESET)
+        elif kind == 'delay':
+            multi_rig.send(name, DELAY, int(args[0]) - 100)
+        elif kind == 'volume':
+            multi_rig.send(name, VOLUME, int(args[0]))
+        elif kind == 'status':
+            for rig in multi_rig:
+                if name in (None, rig.name):
+                    pipeline = rig.reader.pipeline
+                    notify('status', rig=rig.name, state=pipeline.state, stage=pipeline.stage_name,
+                           packets=pipeline.packets, sound_banks=len(multi_rig.banks))
+        else:
+            notify('unknown_command', arg=line.strip())
+    except (IndexError, ValueError):
+        notify('bad_command', arg=line.strip())
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='DiRTy Pacenotes without the GUI')
+    parser.add_argument('--app-path', default=os.getcwd(), help='folder with data and co-drivers')
+    parser.add_argument('--config', help='config.ini, data/config.ini in the app path if omitted')
+    parser.add_argument('--events', choices=sorted(EVENT_SINKS), default='log')
+    parser.add_argument('--verbose', action='store_true', help='also report distance and loading progress')
+    parser.add_argument('--startup-report', action='store_true', help='print startup phase times to stderr')
+    parser.add_argument('--rig', action='append', default=[], metavar='NAME:PORT[:CO_DRIVER]',
+                        help='serve a rig, repeat for several rigs in one process')
+    for key in ('ip', 'port', 'co_driver', 'delay', 'volume', 'backend', 'sound_bank', 'audio_output',
+                'trigger_mode', 'record'):
+        parser.add_argument('--' + key.replace('_', '-'), dest=key)
+    args = parser.parse_args(argv)
+
+    report = StartupReport()
+    report.mark('imports')
+    config = read_config(args.config or os.path.join(args.app_path, 'data', 'config.ini'))
+    config.update((key, value) for key, value in vars(args).items() if key in DEFAULTS and value is not None)
+    try:
+        rigs = parse_rigs(args.rig, config)
+    except ValueError:
+        parser.error('--rig takes NAME:PORT[:CO_DRIVER]')
+    if not all(rig['co_driver'] for name, rig in rigs):
+        parser.error('no co-driver in config.ini, pass --co-driver')
+
+    notify = EVENT_SINKS[args.events](args.verbose)
+    report.mark('config')
+    multi_rig = start(rigs, args.app_path, notify, report, config['backend'])
+    for name, rig in rigs:
+        notify('started', rig=name, co_driver=rig['co_driver'], port=rig['port'])
+    if args.startup_report:
+        sys.stderr.write(report.format() + '\n')
+    try:
+        for line in sys.stdin:
+            if not command(line, multi_rig, notify):
+                break
+        else:
+            while any(rig.reader.is_alive() for rig in multi_rig):  # No console, run until interrupted.
+                time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    for rig in list(multi_rig):
+        multi_rig.remove(rig.name)
+        notify('stopped', rig=rig.name)
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()  # Sound decoding workers of a frozen app.
+    main()
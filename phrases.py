@@ -0,0 +1,125 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from collections import OrderedDict
+from queue import Queue
+from threading import Lock, Thread
+from soundbank import concat
+
+
+# Pacenotes {dist: line} to {dist: (sound_name, ...)} of existing sounds, return them with unknown names.
+def compile_pacenotes(dic_pacenotes, sound_bank):
+    phrases = OrderedDict()
+    missing = OrderedDict()
+    for dist, line in dic_pacenotes.items():
+        tokens = []
+        for sound_name in line.split():
+            if sound_name in sound_bank:
+                tokens.append(sound_name)
+            else:
+                missing[sound_name] = None
+        phrases[dist] = tuple(tokens)
+    return phrases, list(missing)
+
+
+# Compiled pacenotes rendered into one gain-applied segment, LRU by bytes
+class PhraseCache:
+    def __init__(self, sound_bank, co_driver='', max_bytes=64 * 1024 * 1024, on_missing=None):
+        self.sound_bank = sound_bank
+        self.co_driver = co_driver
+        self.max_bytes = max_bytes
+        self.on_missing = on_missing  # Called with the name of a missing sound.
+        self.entries = OrderedDict()  # {(phrase, volume, co_driver): segment}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+        self.jobs = Queue()
+        self.worker = None
+
+    def get(self, phrase, volume):
+        key = (phrase, volume, self.co_driver)
+        with self.lock:
+            segment = self.entries.get(key)
+            if segment is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        return segment
+
+    # Cached segment without counting a hit or refreshing it.
+    def peek(self, phrase, volume):
+        return self.entries.get((phrase, volume, self.co_driver))
+
+    # Render phrase and keep it, None if none of its sounds exist.
+    def render(self, phrase, volume):
+        sounds = []
+        for sound_name in phrase:
+            try:
+                sounds.append(self.sound_bank[sound_name])
+            except KeyError:
+                if self.on_missing:
+                    self.on_missing(sound_name)
+        if not sounds:
+            return None
+        segment = concat(sounds) + volume
+        self.put((phrase, volume, self.co_driver), segment)
+        return segment
+
+    def put(self, key, segment):
+        nbytes = len(segment.raw_data)
+        with self.lock:
+            if key in self.entries:
+                self.size -= len(self.entries.pop(key).raw_data)
+            self.entries[key] = segment
+            self.size += nbytes
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                old_key, old_segment = self.entries.popitem(last=False)
+                self.size -= len(old_segment.raw_data)
+
+    # Drop phrases rendered with other volume or not in phrases.
+    def retain(self, phrases, volume):
+        phrases = set(phrases)
+        with self.lock:
+            for key in [key for key in self.entries if key[0] not in phrases or key[1] != volume]:
+                self.size -= len(self.entries.pop(key).raw_data)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    # Render phrases ahead of time on a background thread.
+    def prerender(self, phrases, volume):
+        self.jobs.put((list(phrases), volume))
+        if self.worker is None:
+            self.worker = Thread(target=self.render_jobs, daemon=True)
+            self.worker.start()
+
+    def render_jobs(self):
+        while True:
+            phrases, volume = self.jobs.get()
+            if not self.jobs.empty():
+                continue  # Newer job supersedes this one.
+            self.retain(phrases, volume)
+            for phrase in phrases:
+                if not self.jobs.empty():
+                    break
+                if phrase and (phrase, volume, self.co_driver) not in self.entries:
+                    self.render(phrase, volume)
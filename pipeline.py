@@ -0,0 +1,292 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import time
+from collections import OrderedDict
+from control import QUIT, RESET, DELAY, VOLUME, PACENOTES
+from triggers import TimedSchedule, TriggerSchedule
+
+
+# Pipeline states.
+IDLE = 'idle'  # Menus, waiting for telemetry from a stage.
+LOADING = 'loading'  # Reading pacenotes file of detected stage.
+STAGED = 'staged'  # Pacenotes ready, car at the start line.
+COUNTDOWN = 'countdown'  # Countdown called, timing clock not started.
+RUNNING = 'running'  # Timing clock running.
+PAUSED = 'paused'  # Game paused with the clock running.
+FINISHED = 'finished'  # Stage finished, waiting for the next run.
+ON_STAGE = (STAGED, COUNTDOWN, RUNNING, PAUSED)
+
+SYSTEM_SOUNDS = ('countdown_start', 'wrong_way')  # Played on any stage.
+COUNTDOWN_START = ('countdown_start',)
+WRONG_WAY = ('wrong_way',)
+MAX_HORIZON = 0.5  # Seconds a call is scheduled ahead of the next packet at most.
+PACENOTE_ERRORS = (IOError, ValueError, IndexError)  # Pacenotes file missing, unreadable or malformed.
+
+
+# Read pacenotes file.
+def read_pacenotes(stage_file):
+    dic_pacenotes = OrderedDict()
+    with open(stage_file, 'r') as f:
+        for line in f:
+            if line and line.strip():
+                lis = line.split(',')  # list [curr_dist, sound]
+                key = int(lis[0])  # key as integer
+                val = lis[1].strip()  # value as string
+                dic_pacenotes[key] = val  # dictionary
+            else:
+                continue  # skip empty lines
+    return dic_pacenotes
+
+
+# Modification time of file, None if it does not exist.
+def mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+# Load pacenotes file in the calling thread, None if it cannot be read.
+def load_pacenotes(stage_file, callback):
+    try:
+        dic_pacenotes = read_pacenotes(stage_file)
+    except PACENOTE_ERRORS:
+        dic_pacenotes = None
+    callback(dic_pacenotes)
+
+
+# Telemetry to pacenote calls, shared by all Reader backends
+class Pipeline:
+    def __init__(self, config, stages, player, notify, load=load_pacenotes):
+        self.pace_path = config['pace_path']
+        self.delay = config['delay']
+        self.volume = config['volume']
+        self.countdown = config['countdown']
+        self.stages = stages  # StageIndex
+        self.player = player
+        self.notify = notify  # notify(topic, **kwargs)
+        self.load = load  # load(stage_file, callback)
+
+        self.dic_pacenotes = OrderedDict()
+        self.phrases = OrderedDict()  # {dist: (sound_name, ...)} compiled from dic_pacenotes.
+        self.timed = config.get('trigger_mode', 'distance') == 'time'
+        if self.timed:  # Call notes lead_time seconds ahead at the current speed.
+            self.schedule = TimedSchedule(lambda pace: player.duration(pace, self.volume),
+                                          config.get('lead_time', 1.0), player.latency)
+        else:  # Call notes delay meters ahead.
+            self.schedule = TriggerSchedule()
+        self.interval = 1 / 60  # Average seconds between packets.
+        self.last_packet = 0.0
+        self.state = IDLE
+        self.running = True
+        self.packets = 0
+        self.last_dist = -20
+        self.last_time = 0
+        self.pos_y = 0
+        self.total_laps = 0
+        self.stage_length = 0
+        self.stage_path = ''
+        self.stage_name = ''
+        self.stage_name_dic = ''
+        self.stage_folder = ''
+        self.stage_file = ''
+        self.count_played = False
+        self.restart = False
+        self.ambiguous = ()
+        self.signature = None  # (stage_length, pos_y, total_laps) of the detected stage.
+        self.failed = None  # (stage_file, mtime) that could not be read.
+        self.loading = None  # (stage_file, mtime) being loaded.
+        self.loaded = None  # (stage_file, mtime) of dic_pacenotes.
+
+    def feed(self, udp_data):
+        self.packets += 1
+        if self.state in ON_STAGE:
+            self.stage_packet(udp_data)
+        elif self.state == IDLE:
+            self.idle_packet(udp_data)
+        elif self.state == FINISHED:
+            if int(udp_data.curr_lap) == 0:  # Restart or next stage.
+                self.idle_packet(udp_data)
+        # Packets received while LOADING are dropped.
+
+    # Apply control message.
+    def apply(self, kind, value=None):
+        if kind == QUIT:
+            self.running = False
+        elif kind == RESET:
+            self.state = IDLE
+        elif kind == DELAY:
+            self.delay = value
+            self.compile_schedule()
+        elif kind == VOLUME:
+            self.volume = value
+            self.player.prepare(self.phrases.values(), self.volume)
+        elif kind == PACENOTES:
+            self.dic_pacenotes.clear()
+            for key, val in list(value.items()):
+                self.dic_pacenotes[int(key)] = val.strip()
+            self.compile_pacenotes()
+            self.compile_schedule()
+            self.prepare_sounds()
+            if self.stage_file:  # Edited pacenotes of the detected stage, enter it on the next packet.
+                self.loaded = (self.stage_file, mtime(self.stage_file))
+                self.failed = None
+
+    # Resolve sounds of all pacenotes, report unknown ones at once.
+    def compile_pacenotes(self):
+        self.phrases, missing = self.player.compile(self.dic_pacenotes)
+        if missing:
+            self.notify('sounds_missing', arg=missing)
+
+    def compile_schedule(self):
+        self.schedule.compile(self.phrases, self.delay)
+        self.schedule.seek(self.last_dist)
+
+    # Prefetch the sounds of the pacenotes, then render their phrases.
+    def prepare_sounds(self):
+        phrases = self.phrases.values()
+        tokens = OrderedDict.fromkeys(SYSTEM_SOUNDS)
+        for phrase in phrases:
+            tokens.update(OrderedDict.fromkeys(phrase))
+        self.player.prefetch(tokens)
+        self.player.prepare(phrases, self.volume)
+
+    # Perform initial UDP detection.
+    def idle_packet(self, udp_data):
+        total_time = int(udp_data.total_time)
+        self.pos_y = int(udp_data.pos_y)
+        curr_lap = int(udp_data.curr_lap)
+        self.total_laps = int(udp_data.total_laps)
+        self.stage_length = round(udp_data.stage_length, 4)
+
+        if total_time == 0 != curr_lap:  # Wait for udp from next stage after finish.
+            return
+        self.signature = (self.stage_length, self.pos_y, self.total_laps)
+        if not self.detect_stage():  # Unknown or ambiguous, never the previous stage's pacenotes.
+            return
+        self.loading = (self.stage_file, mtime(self.stage_file))
+        if self.loading == self.failed:  # Not created or changed since it could not be read.
+            return
+        if self.loading == self.loaded:  # Same stage and file, keep parsed pacenotes.
+            self.enter_stage()
+            return
+        self.state = LOADING
+        self.load(self.stage_file, self.start_stage)
+
+    # Detect stage, False if telemetry matches no single rally stage.
+    def detect_stage(self):
+        stage = None
+        if self.total_laps == 1:  # Rally stage indicator.
+            stage, ambiguous = self.stages.lookup(self.stage_length, self.pos_y)
+            if ambiguous != self.ambiguous:  # Report once, not on every detection.
+                self.ambiguous = ambiguous
+                if ambiguous:
+                    self.notify('stage_ambiguous', arg=[amb.name for amb in ambiguous])
+            if stage is not None:
+                self.stage_name_dic = stage.name
+                self.stage_folder = stage.folder
+        if self.stage_name_dic != self.stage_name:
+            self.stage_name = self.stage_name_dic
+            self.stage_path = os.path.join(self.pace_path, self.stage_folder)
+            self.stage_file = os.path.join(self.stage_path, self.stage_name + '.txt')
+            self.notify('get_stage', arg1=self.stage_name, arg2=self.stage_path)
+        return stage is not None
+
+    # Pacenotes loaded, None if the file could not be read.
+    def start_stage(self, dic_pacenotes):
+        if dic_pacenotes is None or self.state != LOADING:
+            if dic_pacenotes is None:
+                self.failed = self.loading
+            self.state = IDLE
+            return
+        self.dic_pacenotes = dic_pacenotes
+        self.loaded = self.loading
+        self.failed = None
+        self.last_dist = -20
+        self.compile_pacenotes()
+        self.compile_schedule()
+        self.prepare_sounds()
+        self.enter_stage()
+
+    # Car at the start line with pacenotes ready.
+    def enter_stage(self):
+        self.last_dist = -20
+        self.last_time = 0
+        self.last_packet = 0.0
+        self.schedule.seek(self.last_dist)
+
+        # Play countdown sound.
+        if self.countdown and not self.count_played:
+            self.count_played = True
+            if self.player.has('countdown_start'):
+                self.player.play_phrase(COUNTDOWN_START, self.volume)
+                self.state = COUNTDOWN
+                return
+            self.notify('key_error', arg='countdown_start')
+        self.state = STAGED
+
+    # Receive UDP stream.
+    def stage_packet(self, udp_data):
+        total_time = udp_data.total_time
+        lap_time = int(udp_data.lap_time)
+        curr_dist = int(udp_data.distance)
+        curr_lap = int(udp_data.curr_lap)
+
+        restart = total_time == self.last_time and lap_time == 0
+        if restart != self.restart:
+            self.restart = restart
+            self.notify('get_pause', arg=self.restart)
+
+        # Play sounds.
+        if lap_time > 0:  # Timing clock started.
+            self.count_played = False
+            if curr_lap == 0:  # Car on stage but before finish line.
+                self.state = PAUSED if total_time == self.last_time else RUNNING
+                self.notify('get_dist', arg1=curr_dist, arg2=self.last_dist)
+                if curr_dist > self.last_dist or self.timed and curr_dist == self.last_dist:
+                    self.call_notes(udp_data)
+                elif curr_dist < self.last_dist:
+                    if self.schedule.rewind(curr_dist) and curr_dist > 0:  # Play wrong_way.
+                        self.player.play_phrase(WRONG_WAY, self.volume)
+            elif curr_lap == 1:  # Stage is finished.
+                self.state = FINISHED
+                return
+            self.last_dist = curr_dist
+        elif lap_time == 0:  # Timing clock not started.
+            if self.state in (RUNNING, PAUSED):  # Restarted, stage is entered again.
+                self.state = IDLE
+            elif (round(udp_data.stage_length, 4), int(udp_data.pos_y), int(udp_data.total_laps)) != self.signature:
+                self.state = IDLE  # Other stage selected.
+            return
+        self.last_time = total_time
+
+    # Play every pacenote due since last packet.
+    def call_notes(self, udp_data):
+        if not self.timed:
+            for curr_pace in self.schedule.advance(int(udp_data.distance)):
+                self.player.play_phrase(curr_pace, self.volume)
+            return
+        now = time.perf_counter()
+        if self.last_packet:
+            self.interval += (min(now - self.last_packet, MAX_HORIZON) - self.interval) * 0.1
+        self.last_packet = now
+        # Distance between packets is extrapolated from speed, calls due before the next one are deferred.
+        for curr_pace, wait in self.schedule.advance(udp_data.distance, udp_data.speed, self.interval):
+            self.player.play_phrase(curr_pace, self.volume, at=now + wait if wait else None)
@@ -0,0 +1,121 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import time
+from collections import deque, namedtuple
+from queue import Queue, Full
+from threading import Thread
+from pydub.playback import play
+from phrases import PhraseCache, compile_pacenotes
+
+
+PhraseStat = namedtuple('PhraseStat', 'phrase enqueued started')
+WORD_SECONDS = 0.35  # Duration estimate per word of a phrase not rendered yet.
+
+
+# Audio playback worker
+class Player(Thread):
+    def __init__(self, sound_bank, maxsize=8, on_missing=None, sink=play, co_driver='',
+                 cache_bytes=64 * 1024 * 1024, output=None):
+        Thread.__init__(self)
+
+        self.sound_bank = sound_bank
+        self.output = output  # AudioEngine, replaces sink.
+        self.sink = output.play if output else sink  # Output of one sound, pydub play blocks.
+        self.on_missing = on_missing  # Called with the name of a missing sound.
+        self.cache = PhraseCache(sound_bank, co_driver, cache_bytes, on_missing)
+        self.commands = Queue(maxsize)
+        self.stats = deque(maxlen=256)  # Recent phrases with their timestamps.
+        self.dropped = 0
+
+        self.running = True
+        self.setDaemon(True)
+        self.start()
+
+    # Enqueue phrase with its prepared segment if cached, never blocks the caller.
+    # phrase is a tuple of sound names or a line of them, playback starts at perf_counter time at, if given.
+    def play_phrase(self, phrase, volume, at=None):
+        if isinstance(phrase, str):
+            phrase = tuple(phrase.split())
+        try:
+            self.commands.put_nowait((phrase, volume, time.perf_counter(), at, self.cache.get(phrase, volume)))
+        except Full:
+            self.dropped += 1
+            return False
+        return True
+
+    # Resolve sound names of pacenotes once, return {dist: phrase} and the unknown names.
+    def compile(self, dic_pacenotes):
+        return compile_pacenotes(dic_pacenotes, self.sound_bank)
+
+    # Render phrases before they are called.
+    def prepare(self, phrases, volume):
+        self.cache.prerender(phrases, volume)
+
+    # Load sounds ahead of time if the sound bank loads them lazily, per Player if the bank is shared.
+    def prefetch(self, sound_names):
+        if hasattr(self.sound_bank, 'prefetch'):
+            self.sound_bank.prefetch(sound_names, owner=self)
+
+    # Seconds the phrase plays, estimated if not rendered yet.
+    def duration(self, phrase, volume):
+        segment = self.cache.peek(phrase, volume)
+        if segment is None:
+            return len(phrase) * WORD_SECONDS
+        return segment.duration_seconds
+
+    def has(self, sound_name):
+        return sound_name in self.sound_bank
+
+    # Seconds from play_phrase until the phrase is heard.
+    def latency(self):
+        return self.output.latency() if self.output else 0.0
+
+    # Cut the phrase being played, only possible with an output engine.
+    def interrupt(self):
+        if self.output:
+            self.output.interrupt()
+
+    def stop(self):
+        self.running = False
+        if self.output:
+            self.output.close()
+        try:
+            self.commands.put_nowait(None)
+        except Full:
+            pass
+
+    # Seconds between enqueue and playback start of recent phrases.
+    def lag(self):
+        return [stat.started - stat.enqueued for stat in self.stats]
+
+    def run(self):
+        while self.running:
+            command = self.commands.get()
+            if command is None:
+                break
+            phrase, volume, enqueued, at, segment = command
+            if at is not None:  # Deferred start.
+                wait = at - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+            if segment is None:
+                segment = self.cache.render(phrase, volume)
+            self.stats.append(PhraseStat(phrase, enqueued, time.perf_counter()))
+            if segment is not None:
+                self.sink(segment)
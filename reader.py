@@ -0,0 +1,130 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import selectors
+import socket
+from threading import Thread
+from audio import open_output
+from pipeline import Pipeline, IDLE
+from playback import Player
+from recorder import Recorder
+from soundbank import LazySoundBank, load_sounds
+from telemetry import Decoder
+
+
+def make_socket(server):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(server)
+    return sock
+
+
+# Sound bank, Player and recorder of one co-driver session, set up and released by either Reader backend
+class Session(Thread):
+    def __init__(self, config, snd_files, sound_bank, notify, player=None, banks=None):
+        Thread.__init__(self)
+
+        self.snd_files = snd_files
+        self.sound_cache = config.get('sound_cache')
+        self.arena = config.get('sound_bank') == 'arena'  # Serve samples from one memory-mapped file.
+        self.sound_arena = None
+        self.banks = banks  # SoundBanks shared with the other sessions of the process.
+        self.shared = None
+        max_bytes = config.get('sound_bank_mb', 128) * 1024 * 1024
+        if banks is not None:
+            self.shared = banks.acquire(snd_files, self.sound_cache, config.get('sound_bank', 'eager'), max_bytes)
+            sound_bank = self.shared.sound_bank
+        elif config.get('sound_bank') == 'lazy':  # Load only the sounds of detected stages.
+            sound_bank = LazySoundBank(snd_files, self.sound_cache, max_bytes)
+        self.sound_bank = sound_bank
+        self.notify = notify
+        self.recorder = Recorder(config['record']) if config.get('record') else None
+
+        self.player = player or Player(sound_bank, on_missing=self.key_error, co_driver=config.get('co_driver', ''),
+                                       cache_bytes=config.get('phrase_cache_mb', 64) * 1024 * 1024,
+                                       output=open_output(config.get('audio_output', 'play')))
+
+    def load_bank(self):
+        if self.shared is not None:
+            return self.shared.load(self.notify)
+        return load_sounds(self.snd_files, self.sound_bank, self.notify, self.sound_cache, arena=self.arena)
+
+    # Stop playback, release the sound bank and close the recording.
+    def close(self):
+        self.player.stop()
+        if self.shared is not None:
+            self.banks.release(self.shared)
+        if self.recorder:
+            self.recorder.close()
+
+    def key_error(self, sound_name):
+        self.notify('key_error', arg=sound_name)
+
+
+# UDP server
+class Reader(Session):
+    def __init__(self, config, stages, snd_files, sound_bank, control, notify, player=None, banks=None):
+        Session.__init__(self, config, snd_files, sound_bank, notify, player, banks)
+
+        self.control = control
+
+        self.sock = make_socket(config['server'])
+        self.decoder = Decoder()
+        if config['drain']:  # Act on the newest packet only, skipped distance is covered by the schedule.
+            self.recv = self.decoder.recv_latest
+        else:
+            self.recv = self.decoder.recv
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.sock, selectors.EVENT_READ)
+        self.selector.register(control, selectors.EVENT_READ)
+
+        self.pipeline = Pipeline(config, stages, self.player, notify)
+
+        self.setDaemon(True)
+        self.start()
+
+    def run(self):
+        self.sound_arena = self.load_bank()
+
+        pipeline = self.pipeline
+        while pipeline.running:
+            if not self.wait_packet():
+                continue
+            nbytes = self.recv(self.sock)
+            if not nbytes:
+                pipeline.state = IDLE  # lost connection
+                continue
+            if self.recorder:
+                self.recorder.write(memoryview(self.decoder.buffer)[:nbytes])
+            udp_data = self.decoder.decode(nbytes)
+            if udp_data is not None:  # skip packets without stage fields
+                pipeline.feed(udp_data)
+        self.close()
+        self.selector.close()
+        self.sock.close()
+
+    # Wait for UDP packet, apply control messages meanwhile.
+    def wait_packet(self):
+        readable = False
+        for key, events in self.selector.select():
+            if key.fileobj is self.control:
+                for kind, value in self.control.receive():
+                    self.pipeline.apply(kind, value)
+            else:
+                readable = True
+        return readable and self.pipeline.running
@@ -0,0 +1,103 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import mmap
+import os
+import struct
+import time
+from telemetry import Decoder
+
+
+# Log file: MAGIC, then records of (receive time, payload size) + raw UDP payload.
+MAGIC = b'DPNLOG1\n'
+RECORD = struct.Struct('<dH')
+
+
+# Append raw telemetry packets to a binary log
+class Recorder:
+    def __init__(self, log_file, clock=time.time):
+        self.clock = clock
+        new = not os.path.exists(log_file) or os.path.getsize(log_file) == 0
+        self.file = open(log_file, 'ab')
+        if new:
+            self.file.write(MAGIC)
+        self.records = 0
+
+    def write(self, payload, timestamp=None):
+        if timestamp is None:
+            timestamp = self.clock()
+        self.file.write(RECORD.pack(timestamp, len(payload)))
+        self.file.write(payload)
+        self.records += 1
+
+    def close(self):
+        self.file.close()
+
+
+# Memory-mapped log with the recv_into interface of a UDP socket
+class ReplaySocket:
+    def __init__(self, log_file, realtime=False, clock=time.perf_counter, sleep=time.sleep):
+        self.realtime = realtime  # Original pace, otherwise as fast as possible.
+        self.clock = clock
+        self.sleep = sleep
+        with open(log_file, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(MAGIC)] != MAGIC:
+            self.map.close()
+            raise ValueError(log_file + ' is not a telemetry log')
+        self.offset = len(MAGIC)
+        self.first_time = None
+        self.start_clock = 0.0
+        self.timestamp = 0.0  # Receive time of last packet.
+
+    # Copy next payload into buffer, return its size, 0 at end of log.
+    def recv_into(self, buffer):
+        if self.offset + RECORD.size > len(self.map):
+            return 0
+        self.timestamp, size = RECORD.unpack_from(self.map, self.offset)
+        self.offset += RECORD.size
+        if self.realtime:
+            if self.first_time is None:
+                self.first_time = self.timestamp
+                self.start_clock = self.clock()
+            wait = self.start_clock + self.timestamp - self.first_time - self.clock()
+            if wait > 0:
+                self.sleep(wait)
+        buffer[:size] = self.map[self.offset:self.offset + size]
+        self.offset += size
+        return size
+
+    def close(self):
+        self.map.close()
+
+
+# Feed a recorded log into a pipeline, return the decoder with its counters.
+def replay(log_file, pipeline, realtime=False, clock=time.perf_counter, sleep=time.sleep):
+    decoder = Decoder()
+    source = ReplaySocket(log_file, realtime, clock, sleep)
+    try:
+        while pipeline.running:
+            nbytes = decoder.recv(source)
+            if not nbytes:
+                break
+            udp_data = decoder.decode(nbytes)
+            if udp_data is not None:
+                pipeline.feed(udp_data)
+    finally:
+        source.close()
+    return decoder
@@ -0,0 +1,82 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+from collections import OrderedDict, namedtuple
+from functools import partial
+from control import ControlChannel, QUIT
+from soundbank import SoundBanks
+
+Rig = namedtuple('Rig', 'name reader control')
+
+
+# Several rigs served by one process, each with its own listener, stage state, schedule, delay and volume.
+# Co-driver sounds are decoded once and shared by the rigs using them.
+class MultiRig:
+    def __init__(self, stages, notify, backend):
+        self.stages = stages  # StageIndex, read only.
+        self.notify = notify  # notify(topic, rig=name, **kwargs)
+        self.backend = backend  # Reader or AsyncReader.
+        self.banks = SoundBanks()
+        self.rigs = OrderedDict()  # {name: Rig}
+
+    def __contains__(self, name):
+        return name in self.rigs
+
+    def __iter__(self):
+        return iter(self.rigs.values())
+
+    # Start a Reader for the rig, config is used as given, see rig_config for files of several rigs.
+    def add(self, name, config, snd_files):
+        if name in self.rigs:
+            raise ValueError('rig {} is running already'.format(name))
+        control = ControlChannel()
+        reader = self.backend(config, self.stages, snd_files, {}, control,
+                              partial(self.notify_rig, name), banks=self.banks)
+        self.rigs[name] = Rig(name, reader, control)
+        return self.rigs[name]
+
+    def notify_rig(self, name, topic, **kwargs):
+        self.notify(topic, rig=name, **kwargs)
+
+    # Control message for one rig, or all rigs if name is None.
+    def send(self, name, kind, value=None):
+        for rig in ([self.rigs[name]] if name is not None else self.rigs.values()):
+            rig.control.send(kind, value)
+
+    def remove(self, name, timeout=2.0):
+        rig = self.rigs.pop(name)
+        rig.control.send(QUIT)
+        rig.reader.join(timeout)
+        if not rig.reader.is_alive():
+            rig.control.close()
+
+    def close(self, timeout=2.0):
+        for name in list(self.rigs):
+            self.remove(name, timeout)
+
+
+# Config for one of several rigs, files it writes get the rig name so rigs do not overwrite each other.
+def rig_config(name, config):
+    config = dict(config)
+    for key in ('record', 'audio_output'):
+        value = config.get(key)
+        if value and (key == 'record' or value.lower().endswith('.wav')):
+            root, ext = os.path.splitext(value)
+            config[key] = '{}-{}{}'.format(root, name, ext)
+    return config
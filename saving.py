@@ -0,0 +1,161 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+import os
+from queue import Queue
+from threading import Thread
+
+
+JOURNAL = '.journal'  # Suffix of the edit journal next to a stage file.
+SET, DELETE = 'set', 'del'  # Journaled edits.
+SAVE, APPEND, DISCARD = range(3)  # Writer jobs.
+
+
+def journal_file(stage_file):
+    return stage_file + JOURNAL
+
+
+# Write pacenotes [(dist, pacenote)] to a temp file and rename it over stage_file, never leaves a torn file.
+def write_stage(stage_file, notes):
+    tmp_file = stage_file + '.tmp'
+    with open(tmp_file, 'w') as f:
+        f.write(''.join('{},{}\n'.format(dist, pace) for dist, pace in notes))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, stage_file)
+    remove_journal(stage_file)  # Edits are in the file now.
+
+
+def remove_journal(stage_file):
+    try:
+        os.remove(journal_file(stage_file))
+    except FileNotFoundError:
+        pass
+
+
+# Edits [(op, dist, pacenote)] journaled since stage_file was last saved and the bytes of their lines,
+# a torn last line is skipped.
+def read_journal(stage_file):
+    edits = []
+    end = 0
+    try:
+        with open(journal_file(stage_file), 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    op, dist, pace = json.loads(line)
+                except ValueError:
+                    break
+                edits.append((op, dist, pace))
+                end += len(line)
+    except FileNotFoundError:
+        pass
+    return edits, end
+
+
+# Apply journaled edits of stage_file to document, return how many there were.
+# A torn last line is cut off, edits appended after it would be lost with it.
+def recover(stage_file, document):
+    edits, end = read_journal(stage_file)
+    for op, dist, pace in edits:
+        if op == SET:
+            document.set(dist, pace)
+        else:
+            document.delete([dist])
+    try:
+        if os.path.getsize(journal_file(stage_file)) > end:
+            os.truncate(journal_file(stage_file), end)
+    except OSError:
+        pass  # No journal, or recovery of later edits is lost as before.
+    return len(edits)
+
+
+# Saves and journal appends done in order on a background thread
+class StageWriter(Thread):
+    def __init__(self, notify):
+        Thread.__init__(self)
+
+        self.notify = notify  # 'save_error' is sent when a file cannot be written.
+        self.jobs = Queue()
+        self.saves = 0
+        self.appends = 0
+
+        self.setDaemon(True)
+        self.start()
+
+    # Snapshot of the document, serialised and written on the writer thread.
+    def save(self, stage_file, notes):
+        self.jobs.put((SAVE, stage_file, list(notes)))
+
+    def journal(self, stage_file, op, dist, pace=''):
+        self.jobs.put((APPEND, stage_file, (op, dist, pace)))
+
+    # Edits were dropped by the user, nothing to recover.
+    def discard(self, stage_file):
+        if stage_file:
+            self.jobs.put((DISCARD, stage_file, None))
+
+    def run(self):
+        running = True
+        while running:
+            jobs = [self.jobs.get()]
+            while not self.jobs.empty():
+                jobs.append(self.jobs.get())
+            if None in jobs:
+                running = False
+                jobs = jobs[:jobs.index(None)]
+            self.write(jobs)
+
+    # Write a batch of jobs: the last save of a file, its discards, and the edits after its last save or discard.
+    # A discard only drops journaled edits, an earlier save of the same file is still written.
+    def write(self, jobs):
+        last_save = {stage_file: i for i, (kind, stage_file, payload) in enumerate(jobs) if kind == SAVE}
+        last_reset = {stage_file: i for i, (kind, stage_file, payload) in enumerate(jobs) if kind != APPEND}
+        edits = {}  # {stage_file: [line]} appended since its save.
+        for i, (kind, stage_file, payload) in enumerate(jobs):
+            if kind == SAVE:
+                if i == last_save[stage_file]:
+                    self.write_file(stage_file, payload)
+            elif kind == DISCARD:
+                remove_journal(stage_file)
+            elif i > last_reset.get(stage_file, -1):
+                edits.setdefault(stage_file, []).append(json.dumps(payload) + '\n')
+        for stage_file, lines in edits.items():
+            try:
+                with open(journal_file(stage_file), 'a') as f:
+                    f.write(''.join(lines))
+                    f.flush()
+                    os.fsync(f.fileno())
+                self.appends += len(lines)
+            except OSError:
+                pass  # Only recovery is lost, the edits are still in the editor.
+
+    def write_file(self, stage_file, notes):
+        try:
+            write_stage(stage_file, notes)
+            self.saves += 1
+        except OSError as error:
+            self.notify('save_error', arg='{} could not be saved: {}'.format(os.path.basename(stage_file),
+                                                                             error.strerror))
+
+    # Finish pending writes.
+    def close(self, timeout=None):
+        self.jobs.put(None)
+        self.join(timeout)
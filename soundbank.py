@@ -0,0 +1,384 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from threading import Condition, Event, Lock, Thread
+from pydub import AudioSegment
+from pydub.exceptions import CouldntDecodeError
+
+
+# Decoded cache file: HEADER (magic, sample width, channels, frame rate) + raw PCM.
+HEADER = struct.Struct('<4sHHI')
+MAGIC = b'DPCM'
+PROGRESS_INTERVAL = 0.1  # Seconds between progress messages.
+OUTPUT_FORMAT = (44100, 2, 1)  # Frame rate, sample width, channels of the arena.
+DECODE_ERRORS = (IndexError, IOError, CouldntDecodeError)  # Sound file missing, corrupt or unsupported.
+
+
+# Cache file name from path, size and mtime of the sound file.
+def cache_file(cache_dir, snd_file):
+    stat = os.stat(snd_file)
+    key = '{}|{}|{}'.format(os.path.abspath(snd_file), stat.st_size, stat.st_mtime_ns)
+    return os.path.join(cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.pcm')
+
+
+def write_pcm(pcm_file, sound):
+    tmp_file = pcm_file + '.tmp{}'.format(os.getpid())
+    with open(tmp_file, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, sound.sample_width, sound.channels, sound.frame_rate))
+        f.write(sound.raw_data)
+    os.replace(tmp_file, pcm_file)
+
+
+def read_pcm(pcm_file):
+    with open(pcm_file, 'rb') as f:
+        magic, sample_width, channels, frame_rate = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise IOError(pcm_file + ' is not a decoded sound')
+        return AudioSegment(data=f.read(), sample_width=sample_width, frame_rate=frame_rate, channels=channels)
+
+
+# Decode one sound file into the cache, runs in a worker process.
+def decode_file(snd_file, pcm_file):
+    try:
+        write_pcm(pcm_file, AudioSegment.from_file(snd_file))
+    except DECODE_ERRORS:
+        return False
+    return True
+
+
+# Load sound files into sound_bank, decoding changed files across a process pool.
+# With arena, samples are served from one memory-mapped PCM file of the co-driver.
+def load_sounds(snd_files, sound_bank, notify, cache_dir=None, workers=None, arena=False):
+    if isinstance(sound_bank, LazySoundBank):  # Sounds are loaded per stage.
+        notify('get_progress', arg=len(snd_files))
+        return None
+    progress = Progress(notify)
+    if not cache_dir:
+        for snd_file in snd_files:
+            try:
+                sound_bank[Path(snd_file).stem] = AudioSegment.from_file(snd_file)
+            except DECODE_ERRORS:
+                pass
+            progress.step()
+        progress.flush()
+        return
+
+    os.makedirs(cache_dir, exist_ok=True)
+    pcm_files = {snd_file: cache_file(cache_dir, snd_file) for snd_file in snd_files}
+    changed = [snd_file for snd_file, pcm_file in pcm_files.items() if not os.path.exists(pcm_file)]
+    decoded = set(pcm_files) - set(changed)
+    for snd_file in decoded:
+        if not arena:
+            load_pcm(snd_file, pcm_files[snd_file], sound_bank)
+        progress.step()
+    if changed:
+        with ProcessPoolExecutor(workers) as pool:
+            for snd_file, ok in zip(changed, pool.map(decode_file, changed, [pcm_files[f] for f in changed])):
+                if ok and not arena:
+                    load_pcm(snd_file, pcm_files[snd_file], sound_bank)
+                progress.step()
+    keep = set(pcm_files.values())
+    if arena:
+        sources = {Path(snd_file).stem: pcm_file for snd_file, pcm_file in pcm_files.items()
+                   if os.path.exists(pcm_file)}
+        sound_arena = SoundArena.load(cache_dir, sources)
+        sound_bank.update(sound_arena.sounds())
+        keep.update((sound_arena.arena_file, sound_arena.index_file))
+    progress.flush()
+    prune(cache_dir, keep)
+    return sound_arena if arena else None
+
+
+def load_pcm(snd_file, pcm_file, sound_bank):
+    try:
+        sound_bank[Path(snd_file).stem] = read_pcm(pcm_file)
+    except IOError:
+        pass
+
+
+# Remove cached sounds and arenas whose files were changed or deleted.
+def prune(cache_dir, keep):
+    for name in os.listdir(cache_dir):
+        cached_file = os.path.join(cache_dir, name)
+        if name.endswith(('.pcm', '.arena', '.json')) and cached_file not in keep:
+            try:
+                os.remove(cached_file)
+            except OSError:
+                pass  # Arena still mapped by another process.
+
+
+# Join sounds into one segment, without pydub's per-append copies when formats match.
+def concat(sounds):
+    first = sounds[0]
+    fmt = (first.frame_rate, first.sample_width, first.channels)
+    if all((sound.frame_rate, sound.sample_width, sound.channels) == fmt for sound in sounds):
+        return AudioSegment(data=b''.join(sound.raw_data for sound in sounds), frame_rate=fmt[0],
+                            sample_width=fmt[1], channels=fmt[2])
+    segment = first
+    for sound in sounds[1:]:
+        segment = segment + sound
+    return segment
+
+
+# All samples of a co-driver in one raw PCM file with an offset index
+class SoundArena:
+    def __init__(self, arena_file, index_file):
+        self.arena_file = arena_file
+        self.index_file = index_file
+        with open(index_file, 'r') as f:
+            index = json.load(f)
+        self.frame_rate, self.sample_width, self.channels = index['format']
+        self.index = index['sounds']  # {name: [offset, length]}
+        with open(arena_file, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b''
+        self.view = memoryview(self.map)
+
+    # Open arena for sources {name: pcm_file}, build it first if any source changed.
+    @classmethod
+    def load(cls, cache_dir, sources, output_format=OUTPUT_FORMAT):
+        key = hashlib.sha1(json.dumps([sorted(os.path.basename(f) for f in sources.values()),
+                                       sorted(sources), output_format]).encode('utf-8')).hexdigest()
+        arena_file = os.path.join(cache_dir, key + '.arena')
+        index_file = os.path.join(cache_dir, key + '.json')
+        if not (os.path.exists(arena_file) and os.path.exists(index_file)):
+            cls.build(arena_file, index_file, sources, output_format)
+        return cls(arena_file, index_file)
+
+    @staticmethod
+    def build(arena_file, index_file, sources, output_format=OUTPUT_FORMAT):
+        frame_rate, sample_width, channels = output_format
+        index = {}
+        offset = 0
+        tmp_file = arena_file + '.tmp{}'.format(os.getpid())
+        with open(tmp_file, 'wb') as f:
+            for name in sorted(sources):
+                sound = read_pcm(sources[name])
+                sound = sound.set_frame_rate(frame_rate).set_sample_width(sample_width).set_channels(channels)
+                data = sound.raw_data
+                f.write(data)
+                index[name] = [offset, len(data)]
+                offset += len(data)
+        os.replace(tmp_file, arena_file)
+        with open(index_file + '.tmp', 'w') as f:
+            json.dump({'format': list(output_format), 'sounds': index}, f)
+        os.replace(index_file + '.tmp', index_file)
+
+    # Zero-copy PCM of one sample.
+    def sample(self, name):
+        offset, length = self.index[name]
+        return self.view[offset:offset + length]
+
+    def sound(self, name):
+        return AudioSegment(data=self.sample(name), frame_rate=self.frame_rate, sample_width=self.sample_width,
+                            channels=self.channels)
+
+    def sounds(self):
+        return {name: self.sound(name) for name in self.index}
+
+
+# Sounds loaded on first use or prefetched per stage, LRU by bytes
+class LazySoundBank:
+    def __init__(self, snd_files, cache_dir=None, max_bytes=128 * 1024 * 1024):
+        self.files = {Path(snd_file).stem: snd_file for snd_file in snd_files}
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # {name: sound}
+        self.size = 0
+        self.loads = 0
+        self.evictions = 0
+        self.lock = Lock()
+        self.load_lock = Lock()  # One decode per sound, also across threads.
+        self.jobs = Condition()
+        self.pending = OrderedDict()  # {owner: deque of names} to prefetch, one stage per session.
+        self.worker = None
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def __len__(self):
+        return len(self.files)
+
+    def __contains__(self, name):
+        return name in self.files
+
+    def __getitem__(self, name):
+        sound = self.lookup(name)
+        if sound is None:
+            with self.load_lock:
+                sound = self.lookup(name)  # Loaded meanwhile by the other thread.
+                if sound is None:
+                    sound = self.load(name)
+        return sound
+
+    def get(self, name, default=None):
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def lookup(self, name):
+        with self.lock:
+            sound = self.entries.get(name)
+            if sound is not None:
+                self.entries.move_to_end(name)
+        return sound
+
+    def load(self, name):
+        snd_file = self.files[name]
+        try:
+            if self.cache_dir:
+                pcm_file = cache_file(self.cache_dir, snd_file)
+                if not os.path.exists(pcm_file):
+                    write_pcm(pcm_file, AudioSegment.from_file(snd_file))
+                sound = read_pcm(pcm_file)
+            else:
+                sound = AudioSegment.from_file(snd_file)
+        except DECODE_ERRORS:
+            self.files.pop(name, None)  # Report as missing from now on.
+            raise KeyError(name)
+        self.put(name, sound)
+        self.loads += 1
+        return sound
+
+    def put(self, name, sound):
+        with self.lock:
+            self.entries[name] = sound
+            self.size += len(sound.raw_data)
+            while self.size > self.max_bytes and len(self.entries) > 1:
+                old_name, old_sound = self.entries.popitem(last=False)
+                self.size -= len(old_sound.raw_data)
+                self.evictions += 1
+
+    # Load sounds of a stage on a background thread, unknown names are skipped.
+    # A newer stage of the same owner supersedes its previous one, stages of other owners are kept.
+    def prefetch(self, names, owner=None):
+        with self.jobs:
+            self.pending[owner] = deque(names)
+            self.jobs.notify()
+            if self.worker is None:
+                self.worker = Thread(target=self.load_jobs, daemon=True)
+                self.worker.start()
+
+    def load_jobs(self):
+        while True:
+            with self.jobs:
+                while not self.pending:
+                    self.jobs.wait()
+                owner, names = next(iter(self.pending.items()))
+                name = names.popleft()
+                if names:
+                    self.pending.move_to_end(owner)  # Round robin between owners.
+                else:
+                    del self.pending[owner]
+            if name in self.files:
+                self.get(name)
+
+
+# Sound bank of one co-driver shared by the sessions of a process, loaded by the first one
+class SharedBank:
+    def __init__(self, key, snd_files, cache_dir, mode, max_bytes):
+        self.key = key
+        self.snd_files = snd_files
+        self.cache_dir = cache_dir
+        self.arena = mode == 'arena'
+        if mode == 'lazy':
+            self.sound_bank = LazySoundBank(snd_files, cache_dir, max_bytes)
+        else:
+            self.sound_bank = {}
+        self.sound_arena = None
+        self.refs = 0
+        self.loading = False
+        self.loaded = Event()
+        self.lock = Lock()
+
+    # A lazy bank shared by sessions holds the largest budget any of them asked for, not the sum:
+    # they play the same sounds.
+    def reserve(self, max_bytes):
+        if isinstance(self.sound_bank, LazySoundBank):
+            self.sound_bank.max_bytes = max(self.sound_bank.max_bytes, max_bytes)
+
+    # Load once, later sessions wait for the first one. Return the arena, if any.
+    def load(self, notify):
+        with self.lock:
+            first, self.loading = not self.loading, True
+        if first:
+            try:
+                self.sound_arena = load_sounds(self.snd_files, self.sound_bank, notify, self.cache_dir,
+                                               arena=self.arena)
+            finally:
+                self.loaded.set()
+        else:
+            self.loaded.wait()
+            notify('get_progress', arg=len(self.snd_files))
+        return self.sound_arena
+
+
+# Sound banks by co-driver and bank mode, reference counted by the sessions using them
+class SoundBanks:
+    def __init__(self):
+        self.banks = {}  # {key: SharedBank}
+        self.lock = Lock()
+
+    def acquire(self, snd_files, cache_dir=None, mode='eager', max_bytes=128 * 1024 * 1024):
+        key = (tuple(sorted(snd_files)), cache_dir, mode)
+        with self.lock:
+            bank = self.banks.get(key)
+            if bank is None:
+                bank = self.banks[key] = SharedBank(key, snd_files, cache_dir, mode, max_bytes)
+            bank.reserve(max_bytes)
+            bank.refs += 1
+        return bank
+
+    # The last session to release a bank drops it, its sounds are freed with the Players using them.
+    def release(self, bank):
+        with self.lock:
+            bank.refs -= 1
+            if bank.refs == 0 and self.banks.get(bank.key) is bank:
+                del self.banks[bank.key]
+
+    def __len__(self):
+        return len(self.banks)
+
+
+# Batched 'get_progress' messages
+class Progress:
+    def __init__(self, notify):
+        self.notify = notify
+        self.loaded = 0
+        self.sent = 0
+        self.last = time.perf_counter()
+
+    def step(self):
+        self.loaded += 1
+        now = time.perf_counter()
+        if now - self.last >= PROGRESS_INTERVAL:
+            self.flush()
+            self.last = now
+
+    def flush(self):
+        if self.loaded != self.sent:
+            self.notify('get_progress', arg=self.loaded)
+            self.sent = self.loaded
@@ -0,0 +1,88 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+
+Stage = namedtuple('Stage', 'length pos_start name folder')
+
+
+# Stages sorted by length, keyed by start position within equal lengths
+class StageIndex:
+    def __init__(self, tolerance=0.01, pos_tolerance=0):
+        self.tolerance = tolerance  # Meters between telemetry and stages.csv length.
+        self.pos_tolerance = pos_tolerance  # Meters between telemetry and stages.csv start position.
+        self.entries = []
+        self.lengths = []
+        self.groups = []  # dict {pos_start: [Stage]} for every length.
+        self.skipped = []  # Line numbers of malformed stages.csv rows, left out of the index.
+
+    def __len__(self):
+        return len(self.entries)
+
+    # Read stages.csv rows 'length,pos_start,name,folder', malformed rows are skipped.
+    def read(self, stages_csv):
+        self.skipped = []
+        with open(stages_csv, 'r') as f:
+            _ = next(f)
+            for number, line in enumerate(f, 2):
+                row = line.strip()
+                if not row:
+                    continue
+                try:
+                    length, pos_start, name, folder = row.split(',')[:4]
+                    length = float(length)
+                except ValueError:
+                    self.skipped.append(number)
+                    continue
+                try:
+                    pos_start = int(pos_start)
+                except ValueError:
+                    pos_start = None  # Not needed for stages with unique length.
+                self.entries.append(Stage(length, pos_start, name, folder))
+        self.compile()
+
+    def add(self, length, pos_start, name, folder):
+        self.entries.append(Stage(float(length), pos_start, name, folder))
+        self.compile()
+
+    def compile(self):
+        groups = {}
+        for stage in self.entries:
+            groups.setdefault(stage.length, {}).setdefault(stage.pos_start, []).append(stage)
+        self.lengths = sorted(groups)
+        self.groups = [groups[length] for length in self.lengths]
+
+    # Return (stage, ambiguous), stage is None when no or several stages match.
+    def lookup(self, stage_length, pos_y):
+        lo = bisect_left(self.lengths, stage_length - self.tolerance)
+        hi = bisect_right(self.lengths, stage_length + self.tolerance)
+        candidates = [stage for group in self.groups[lo:hi] for stages in group.values() for stage in stages]
+        if len(candidates) == 1:
+            return candidates[0], ()
+        if not candidates:
+            return None, ()
+        if self.pos_tolerance:
+            matches = [stage for stage in candidates
+                       if stage.pos_start is not None and abs(stage.pos_start - pos_y) <= self.pos_tolerance]
+        else:
+            matches = [stage for group in self.groups[lo:hi] for stage in group.get(pos_y, ())]
+        if len(matches) == 1:
+            return matches[0], ()
+        return None, tuple(matches or candidates)
@@ -0,0 +1,58 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import importlib
+import sys
+import time
+
+START = time.perf_counter()  # Import this module first, before the slow imports.
+
+
+# Seconds spent in each startup phase and in on-demand imports, to track time to first window
+class StartupReport:
+    def __init__(self, start=START):
+        self.start = start
+        self.last = start
+        self.phases = []  # [(phase, seconds, seconds since start)]
+        self.imports = []  # [(module, seconds)]
+
+    # End the current phase.
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last, now - self.start))
+        self.last = now
+
+    # Import a module on first use, the first import is timed.
+    def load(self, name):
+        if name in sys.modules:
+            return sys.modules[name]
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        self.imports.append((name, time.perf_counter() - start))
+        return module
+
+    def format(self):
+        lines = ['{:>9} {:>9}  {}'.format('phase ms', 'total ms', 'phase')]
+        lines += ['{:9.1f} {:9.1f}  {}'.format(seconds * 1000, total * 1000, phase)
+                  for phase, seconds, total in self.phases]
+        lines += ['{:9.1f} {:>9}  import {}'.format(seconds * 1000, '', name) for name, seconds in self.imports]
+        return '\n'.join(lines)
+
+    def write(self, report_file):
+        with open(report_file, 'w') as f:
+            f.write(self.format() + '\n')
@@ -0,0 +1,78 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import struct
+from collections import namedtuple
+
+
+# Fields read from the Codemasters extradata=3 float array:
+# 0 total_time, 1 lap_time, 2 distance, 5 pos_y, 7 speed (m/s), 59 curr_lap, 60 total_laps, 61 stage_length.
+Telemetry = namedtuple('Telemetry', 'total_time lap_time distance pos_y speed curr_lap total_laps stage_length')
+
+EXTRADATA_3 = struct.Struct('<3f8xf4xf204x3f')  # Offsets 0, 4, 8, 20, 28, 236, 240, 244.
+
+# Packet sizes sent by the games, None for layouts without stage fields.
+PACKET_SIZES = {
+    152: None,  # extradata=0
+    256: EXTRADATA_3,  # DiRT Rally, extradata=3
+    264: EXTRADATA_3,  # DiRT Rally 2.0, extradata=3
+}
+BUFFER_SIZE = 2048
+
+
+# Field-selective decoder reading into one preallocated buffer
+class Decoder:
+    def __init__(self):
+        self.buffer = bytearray(BUFFER_SIZE)
+        self.spare = bytearray(BUFFER_SIZE)
+        self.packet_size = 0
+        self.rejected = 0  # Packets without stage fields.
+        self.coalesced = 0  # Stale packets dropped by recv_latest.
+
+    # Read one datagram, return its size, 0 on lost connection.
+    def recv(self, sock):
+        return sock.recv_into(self.buffer)
+
+    # Read one datagram, then drain the socket and keep only the newest one.
+    def recv_latest(self, sock):
+        nbytes = sock.recv_into(self.buffer)
+        if not nbytes:
+            return 0
+        sock.setblocking(False)
+        try:
+            while True:
+                try:
+                    size = sock.recv_into(self.spare)
+                except (BlockingIOError, ConnectionResetError):
+                    break
+                if not size:
+                    break
+                self.buffer, self.spare = self.spare, self.buffer
+                nbytes = size
+                self.coalesced += 1
+        finally:
+            sock.setblocking(True)
+        return nbytes
+
+    def decode(self, nbytes, buffer=None):
+        layout = PACKET_SIZES.get(nbytes, EXTRADATA_3 if nbytes >= EXTRADATA_3.size else None)
+        if layout is None:
+            self.rejected += 1
+            return None
+        self.packet_size = nbytes
+        return tuple.__new__(Telemetry, layout.unpack_from(self.buffer if buffer is None else buffer))
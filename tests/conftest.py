@@ -0,0 +1,109 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+# Modules of the repo on the path of the tests, a small stage, a Player that records its calls
+# and telemetry logs to replay.
+
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from synthetic import make_packet, null_sink, NullSoundBank
+from pipeline import Pipeline
+from playback import Player
+from recorder import Recorder, replay
+from stages import StageIndex
+
+STAGE_LENGTH = 1000.0
+NOTES = {100: 'left 3', 300: 'right 4', 500: 'crest'}
+
+
+# Player remembering every phrase it was asked to play.
+class RecordingPlayer(Player):
+    def __init__(self):
+        Player.__init__(self, NullSoundBank(), sink=null_sink)
+        self.played = []
+
+    def play_phrase(self, phrase, volume, at=None):
+        self.played.append(tuple(phrase.split()) if isinstance(phrase, str) else tuple(phrase))
+        return Player.play_phrase(self, phrase, volume, at)
+
+
+@pytest.fixture
+def pace_path(tmp_path):
+    path = tmp_path / 'pacenotes'
+    (path / 'test').mkdir(parents=True)
+    (path / 'test' / 'Test.txt').write_text(''.join('{},{}\n'.format(dist, pace) for dist, pace in NOTES.items()))
+    return str(path)
+
+
+@pytest.fixture
+def stages():
+    index = StageIndex()
+    index.add(STAGE_LENGTH, 0, 'Test', 'test')
+    return index
+
+
+@pytest.fixture
+def player():
+    player = RecordingPlayer()
+    yield player
+    player.stop()
+
+
+@pytest.fixture
+def events():
+    return []
+
+
+@pytest.fixture
+def pipeline(pace_path, stages, player, events):
+    config = {'pace_path': pace_path, 'delay': 0, 'volume': 0, 'countdown': False}
+    return Pipeline(config, stages, player, lambda topic, **kwargs: events.append((topic, kwargs)))
+
+
+# Packets of a run through dists: car at the start line, then the timing clock running.
+def drive(dists, start=1.0, stage_length=STAGE_LENGTH):
+    packets = [make_packet(start, 0.0, 0.0, stage_length)]
+    for i, dist in enumerate(dists, 1):
+        packets.append(make_packet(start + i, float(i), dist, stage_length))
+    return packets
+
+
+def finish(dist=STAGE_LENGTH, stage_length=STAGE_LENGTH):
+    return make_packet(100.0, 99.0, dist, stage_length, curr_lap=1.0)
+
+
+# Record packets to a telemetry log and replay it into pipeline.
+@pytest.fixture
+def run(tmp_path, pipeline):
+    def run(packets):
+        log_file = str(tmp_path / 'telemetry.bin')
+        if os.path.exists(log_file):
+            os.remove(log_file)
+        recorder = Recorder(log_file)
+        for i, payload in enumerate(packets):
+            recorder.write(payload, timestamp=i / 60)
+        recorder.close()
+        return replay(log_file, pipeline)
+    return run
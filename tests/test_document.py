@@ -0,0 +1,105 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+from document import PacenoteDocument, Change, INSERTED, UPDATED, TICKED, DELETED, RELOADED
+
+
+def document(notes=None):
+    doc = PacenoteDocument()
+    doc.load(notes or {100: 'left 3', 300: 'right 4', 500: 'crest'})
+    changes = []
+    doc.subscribe(changes.extend)
+    return doc, changes
+
+
+def test_load_reloads_every_row():
+    doc = PacenoteDocument()
+    changes = []
+    doc.subscribe(changes.extend)
+    doc.load(['300,right 4\n', '\n', '100,left 3\n'])
+    assert changes == [Change(RELOADED, None, None)]
+    assert list(doc.items()) == [(100, 'left 3'), (300, 'right 4')]
+
+
+def test_set_inserts_at_row_in_distance_order():
+    doc, changes = document()
+    doc.set(200, 'over\n')
+    assert changes == [Change(INSERTED, 1, 200)]
+    assert doc[200] == 'over'
+
+
+def test_set_existing_updates_row():
+    doc, changes = document()
+    doc.set(300, 'right 5')
+    assert changes == [Change(UPDATED, 1, 300)]
+
+
+def test_delete_reports_last_rows_first():
+    doc, changes = document()
+    doc.tick(100, True)
+    changes.clear()
+    doc.delete([100, 500, 700])
+    assert changes == [Change(DELETED, 2, 500), Change(DELETED, 0, 100)]
+    assert list(doc) == [300]
+    assert doc.ticked == set()
+
+
+def test_delete_ticked():
+    doc, changes = document()
+    doc.tick_all(True)
+    doc.tick(300, False)
+    changes.clear()
+    doc.delete_ticked()
+    assert changes == [Change(DELETED, 2, 500), Change(DELETED, 0, 100)]
+
+
+def test_move_keeps_tick_and_reports_old_and_new_row():
+    doc, changes = document()
+    doc.tick(100, True)
+    changes.clear()
+    doc.move(100, 400)
+    assert changes == [Change(DELETED, 0, 100), Change(INSERTED, 1, 400)]
+    assert doc.ticked == {400}
+    assert doc.get(400) == 'left 3'
+
+
+def test_move_over_existing_updates_it():
+    doc, changes = document()
+    doc.move(100, 300)
+    assert changes == [Change(DELETED, 0, 100), Change(UPDATED, 0, 300)]
+    assert len(doc) == 2
+
+
+def test_tick_absent_distance_changes_nothing():
+    doc, changes = document()
+    doc.tick(200, True)
+    doc.move(200, 400)
+    assert changes == []
+    assert doc.ticked == set()
+
+
+def test_tick_all():
+    doc, changes = document()
+    doc.tick_all(True)
+    assert [change.kind for change in changes] == [TICKED] * 3
+    assert doc.ticked == {100, 300, 500}
+    changes.clear()
+    doc.tick_all(False)
+    assert sorted(change.row for change in changes) == [0, 1, 2]
+    assert doc.ticked == set()
@@ -0,0 +1,42 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import time
+from synthetic import NullSoundBank, null_sink, wait_for
+from playback import Player
+
+
+def test_deferred_phrase_lag_counts_from_enqueue():
+    player = Player(NullSoundBank(), sink=null_sink)
+    at = time.perf_counter() + 0.1
+    player.play_phrase('left 3', 0, at=at)
+    wait_for(lambda: player.stats, timeout=2.0)
+    player.stop()
+    stat = player.stats[0]
+    assert stat.phrase == ('left', '3')
+    assert stat.enqueued < at <= stat.started
+    assert player.lag() == [stat.started - stat.enqueued]
+
+
+def test_immediate_phrase_starts_at_once():
+    player = Player(NullSoundBank(), sink=null_sink)
+    player.play_phrase('left 3', 0)
+    wait_for(lambda: player.stats, timeout=2.0)
+    player.stop()
+    assert 0 <= player.lag()[0] < 0.05
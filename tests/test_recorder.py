@@ -0,0 +1,105 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import struct
+import pytest
+from recorder import MAGIC, Recorder, ReplaySocket, replay
+
+
+def packet(distance, size=264):
+    fields = [0.0] * (size // 4)
+    fields[2] = distance
+    return struct.pack('<{}f'.format(len(fields)), *fields)
+
+
+def record(log_file, payloads, interval=0.5):
+    recorder = Recorder(str(log_file))
+    for i, payload in enumerate(payloads):
+        recorder.write(payload, timestamp=100.0 + i * interval)
+    recorder.close()
+    return recorder.records
+
+
+# Pipeline keeping the distance of every packet fed to it.
+class Collector:
+    def __init__(self, stop_after=None):
+        self.running = True
+        self.stop_after = stop_after
+        self.distances = []
+
+    def feed(self, udp_data):
+        self.distances.append(udp_data.distance)
+        if len(self.distances) == self.stop_after:
+            self.running = False
+
+
+def test_replay_feeds_packets_in_recorded_order(tmp_path):
+    log_file = tmp_path / 'log.bin'
+    assert record(log_file, [packet(dist) for dist in (10, 20, 30)]) == 3
+    collector = Collector()
+    replay(str(log_file), collector)
+    assert collector.distances == [10, 20, 30]
+
+
+def test_recorder_appends_to_existing_log(tmp_path):
+    log_file = tmp_path / 'log.bin'
+    record(log_file, [packet(10)])
+    record(log_file, [packet(20)])
+    assert log_file.read_bytes().count(MAGIC) == 1
+    collector = Collector()
+    replay(str(log_file), collector)
+    assert collector.distances == [10, 20]
+
+
+def test_packets_without_stage_fields_are_rejected(tmp_path):
+    log_file = tmp_path / 'log.bin'
+    record(log_file, [packet(10), b'\0' * 12, packet(20, size=152), packet(30, size=256)])
+    collector = Collector()
+    decoder = replay(str(log_file), collector)
+    assert collector.distances == [10, 30]
+    assert decoder.rejected == 2
+
+
+def test_replay_stops_with_the_pipeline(tmp_path):
+    log_file = tmp_path / 'log.bin'
+    record(log_file, [packet(dist) for dist in (10, 20, 30)])
+    collector = Collector(stop_after=2)
+    replay(str(log_file), collector)
+    assert collector.distances == [10, 20]
+
+
+def test_realtime_replay_keeps_recorded_pace(tmp_path):
+    log_file = tmp_path / 'log.bin'
+    record(log_file, [packet(dist) for dist in (10, 20, 30)], interval=0.5)
+    now = [0.0]
+    waits = []
+
+    def sleep(seconds):
+        waits.append(seconds)
+        now[0] += seconds
+
+    replay(str(log_file), Collector(), realtime=True, clock=lambda: now[0], sleep=sleep)
+    assert waits == [0.5, 0.5]
+
+
+def test_not_a_log(tmp_path):
+    log_file = tmp_path / 'log.bin'
+    log_file.write_bytes(b'not a telemetry log')
+    with pytest.raises(ValueError):
+        ReplaySocket(str(log_file))
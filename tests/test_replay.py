@@ -0,0 +1,110 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+# Recorded telemetry replayed into the Pipeline.
+
+import os
+from conftest import drive, finish, make_packet, STAGE_LENGTH
+from pipeline import IDLE, STAGED, RUNNING, PAUSED, FINISHED
+from stages import StageIndex
+
+LEFT, RIGHT, CREST = ('left', '3'), ('right', '4'), ('crest',)
+
+
+def test_start_line_stages_pacenotes(run, pipeline, player, events):
+    decoder = run(drive([])[:1])
+    assert pipeline.state == STAGED
+    assert ('get_stage', {'arg1': 'Test', 'arg2': pipeline.stage_path}) in events
+    assert decoder.rejected == 0 and pipeline.packets == 1
+    assert player.played == []
+
+
+def test_restart_calls_notes_again(run, pipeline, player):
+    run(drive([200, 350]) + drive([200, 350], start=50.0))
+    assert player.played == [LEFT, RIGHT, LEFT, RIGHT]
+
+
+def test_missing_pacenotes_retried_when_file_appears(run, pipeline, pace_path, player):
+    stage_file = os.path.join(pace_path, 'test', 'Test.txt')
+    text = open(stage_file).read()
+    os.remove(stage_file)
+    run(drive([]))
+    assert pipeline.state == IDLE
+    with open(stage_file, 'w') as f:
+        f.write(text)
+    run(drive([200]))
+    assert player.played == [LEFT]
+
+
+def test_unknown_stage_stays_idle(run, pipeline, player):
+    run(drive([200]))
+    run([make_packet(1.0, 0.0, 0.0, 2500.0)] + drive([200], stage_length=2500.0))
+    assert pipeline.state == IDLE
+    assert player.played == [LEFT]
+
+
+def test_ambiguous_stage_is_reported_and_not_loaded(run, pipeline, player, events):
+    pipeline.stages = StageIndex()
+    pipeline.stages.add(STAGE_LENGTH, 10, 'Test', 'test')
+    pipeline.stages.add(STAGE_LENGTH, 20, 'Other', 'test')
+    run(drive([200]))
+    assert pipeline.state == IDLE
+    assert player.played == []
+    assert ('stage_ambiguous', {'arg': ['Test', 'Other']}) in events
+
+
+def test_notes_called_once_when_crossed(run, pipeline, player):
+    run(drive(range(0, 1000, 50)) + [finish()])
+    assert player.played == [LEFT, RIGHT, CREST]
+    assert pipeline.state == FINISHED
+
+
+def test_notes_skipped_between_packets_are_called(run, player):
+    run(drive([10, 450]))
+    assert player.played == [LEFT, RIGHT]
+
+
+def test_wrong_way_called_when_driving_back_over_a_note(run, pipeline, player):
+    run(drive([200, 350, 250, 350]))
+    assert player.played == [LEFT, RIGHT, ('wrong_way',), RIGHT]
+    assert pipeline.state == RUNNING
+
+
+def test_paused_game_calls_nothing(run, pipeline, player):
+    packets = drive([200])
+    packets.append(packets[-1])  # Clock stopped at the same distance.
+    run(packets)
+    assert pipeline.state == PAUSED
+    assert player.played == [LEFT]
+
+
+def test_finish_waits_for_next_run(run, pipeline, player):
+    run(drive([200]) + [finish(), finish()])
+    assert pipeline.state == FINISHED
+    run(drive([200], start=200.0))
+    assert player.played == [LEFT, LEFT]
+
+
+def test_malformed_pacenotes_stay_idle(run, pipeline, pace_path, player):
+    with open(os.path.join(pace_path, 'test', 'Test.txt'), 'a') as f:
+        f.write('left 3\n')
+    run(drive([200]))
+    assert pipeline.state == IDLE
+    assert pipeline.failed == pipeline.loading
+    assert player.played == []
@@ -0,0 +1,135 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import os
+from document import PacenoteDocument
+from saving import StageWriter, SET, DELETE, SAVE, APPEND, DISCARD, journal_file, read_journal, recover, \
+    write_stage
+
+
+def writer(errors=None):
+    errors = [] if errors is None else errors
+    return StageWriter(lambda topic, arg: errors.append(arg))
+
+
+def read(stage_file):
+    with open(stage_file) as f:
+        return f.read()
+
+
+def test_write_stage_replaces_file_and_drops_journal(tmp_path):
+    stage_file = str(tmp_path / 'Test.txt')
+    open(journal_file(stage_file), 'w').close()
+    write_stage(stage_file, [(100, 'left 3'), (300, 'right 4')])
+    assert read(stage_file) == '100,left 3\n300,right 4\n'
+    assert not os.path.exists(journal_file(stage_file))
+    assert not os.path.exists(stage_file + '.tmp')
+
+
+def test_journaled_edits_recovered(tmp_path):
+    stage_file = str(tmp_path / 'Test.txt')
+    stage_writer = writer()
+    stage_writer.journal(stage_file, SET, 100, 'left 3')
+    stage_writer.journal(stage_file, SET, 300, 'right 4')
+    stage_writer.journal(stage_file, DELETE, 100)
+    stage_writer.close()
+    doc = PacenoteDocument()
+    doc.load({500: 'crest'})
+    assert recover(stage_file, doc) == 3
+    assert list(doc.items()) == [(300, 'right 4'), (500, 'crest')]
+
+
+def test_save_clears_journal(tmp_path):
+    stage_file = str(tmp_path / 'Test.txt')
+    stage_writer = writer()
+    stage_writer.journal(stage_file, SET, 100, 'left 3')
+    stage_writer.save(stage_file, [(100, 'left 3')])
+    stage_writer.close()
+    assert read(stage_file) == '100,left 3\n'
+    assert read_journal(stage_file) == ([], 0)
+    assert stage_writer.saves == 1
+
+
+def test_batch_skips_edits_before_a_later_save_or_discard(tmp_path):
+    saved, discarded = str(tmp_path / 'Saved.txt'), str(tmp_path / 'Discarded.txt')
+    stage_writer = writer()
+    stage_writer.write([(APPEND, saved, (SET, 100, 'left 3')), (SAVE, saved, [(100, 'left 3')]),
+                        (APPEND, saved, (SET, 300, 'right 4')),
+                        (APPEND, discarded, (SET, 100, 'crest')), (DISCARD, discarded, None)])
+    stage_writer.close()
+    assert stage_writer.appends == 1
+    assert read_journal(saved)[0] == [(SET, 300, 'right 4')]
+    assert not os.path.exists(journal_file(discarded))
+
+
+def test_discard_keeps_an_earlier_save_of_the_batch(tmp_path):
+    stage_file = str(tmp_path / 'Test.txt')
+    stage_writer = writer()
+    stage_writer.write([(SAVE, stage_file, [(100, 'left 3')]), (APPEND, stage_file, (SET, 300, 'right 4')),
+                        (DISCARD, stage_file, None)])
+    stage_writer.close()
+    assert read(stage_file) == '100,left 3\n'
+    assert stage_writer.saves == 1 and stage_writer.appends == 0
+    assert not os.path.exists(journal_file(stage_file))
+
+
+def test_only_the_last_save_of_the_batch_is_written(tmp_path):
+    stage_file = str(tmp_path / 'Test.txt')
+    stage_writer = writer()
+    stage_writer.write([(SAVE, stage_file, [(100, 'left 3')]), (SAVE, stage_file, [(300, 'right 4')])])
+    stage_writer.close()
+    assert read(stage_file) == '300,right 4\n'
+    assert stage_writer.saves == 1
+
+
+def test_torn_last_line_skipped(tmp_path):
+    stage_file = str(tmp_path / 'Test.txt')
+    stage_writer = writer()
+    stage_writer.journal(stage_file, SET, 100, 'left 3')
+    stage_writer.close()
+    with open(journal_file(stage_file), 'a') as f:
+        f.write('["set", 300, "rig')  # Crash while appending.
+    doc = PacenoteDocument()
+    assert recover(stage_file, doc) == 1
+    assert list(doc.items()) == [(100, 'left 3')]
+
+
+def test_torn_last_line_cut_before_next_session(tmp_path):
+    stage_file = str(tmp_path / 'Test.txt')
+    stage_writer = writer()
+    stage_writer.journal(stage_file, SET, 100, 'left 3')
+    stage_writer.close()
+    with open(journal_file(stage_file), 'a') as f:
+        f.write('["set", 300, "rig')  # Crash while appending.
+    assert recover(stage_file, PacenoteDocument()) == 1
+
+    stage_writer = writer()
+    stage_writer.journal(stage_file, SET, 500, 'crest')
+    stage_writer.close()
+    doc = PacenoteDocument()
+    assert recover(stage_file, doc) == 2
+    assert list(doc.items()) == [(100, 'left 3'), (500, 'crest')]
+
+
+def test_save_error_reported(tmp_path):
+    errors = []
+    stage_writer = writer(errors)
+    stage_writer.save(str(tmp_path / 'missing' / 'Test.txt'), [(100, 'left 3')])
+    stage_writer.close()
+    assert len(errors) == 1 and errors[0].startswith('Test.txt could not be saved')
@@ -0,0 +1,63 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+import pytest
+from pydub.exceptions import CouldntDecodeError
+from pydub.generators import Sine
+import soundbank
+from soundbank import LazySoundBank, decode_file, load_sounds
+
+
+@pytest.fixture
+def undecodable(monkeypatch):
+    from_file = soundbank.AudioSegment.from_file
+
+    def decode(snd_file, *args, **kwargs):
+        if snd_file.endswith('bad.wav'):
+            raise CouldntDecodeError('Decoding failed')
+        return from_file(snd_file, *args, **kwargs)
+
+    monkeypatch.setattr(soundbank.AudioSegment, 'from_file', decode)
+
+
+@pytest.fixture
+def snd_files(tmp_path):
+    good, bad = str(tmp_path / 'left.wav'), str(tmp_path / 'bad.wav')
+    Sine(440).to_audio_segment(duration=50).export(good, format='wav')
+    with open(bad, 'wb') as f:
+        f.write(b'RIFF not a sound')
+    return [good, bad]
+
+
+def test_undecodable_file_not_cached(tmp_path, snd_files, undecodable):
+    assert decode_file(snd_files[1], str(tmp_path / 'bad.pcm')) is False
+    assert decode_file(snd_files[0], str(tmp_path / 'left.pcm')) is True
+
+
+def test_undecodable_file_skipped_by_eager_bank(snd_files, undecodable):
+    sound_bank = {}
+    load_sounds(snd_files, sound_bank, lambda topic, **kwargs: None)
+    assert list(sound_bank) == ['left']
+
+
+def test_undecodable_file_missing_from_lazy_bank(snd_files, undecodable):
+    sound_bank = LazySoundBank(snd_files)
+    assert sound_bank.get('bad') is None
+    assert 'bad' not in sound_bank
+    assert sound_bank.get('left') is not None
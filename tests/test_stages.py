@@ -0,0 +1,86 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+from stages import StageIndex
+
+
+def index(*stages, **kwargs):
+    stages_index = StageIndex(**kwargs)
+    for stage in stages:
+        stages_index.add(*stage)
+    return stages_index
+
+
+def test_length_within_tolerance():
+    stages = index((1000.0, 0, 'A', 'a'))
+    assert stages.lookup(1000.009, 0)[0].name == 'A'
+    assert stages.lookup(999.991, 0)[0].name == 'A'
+    assert stages.lookup(1000.02, 0) == (None, ())
+
+
+def test_unique_length_ignores_start_position():
+    stages = index((1000.0, None, 'A', 'a'), (2000.0, None, 'B', 'b'))
+    assert stages.lookup(2000.0, 123)[0].name == 'B'
+
+
+def test_equal_lengths_told_apart_by_start_position():
+    stages = index((1000.0, 10, 'A', 'a'), (1000.0, 20, 'B', 'b'))
+    assert stages.lookup(1000.0, 20)[0].name == 'B'
+    stage, ambiguous = stages.lookup(1000.0, 15)
+    assert stage is None
+    assert [amb.name for amb in ambiguous] == ['A', 'B']
+
+
+def test_duplicate_rows_are_ambiguous():
+    stages = index((1000.0, 10, 'A', 'a'), (1000.0, 10, 'A copy', 'a'))
+    stage, ambiguous = stages.lookup(1000.0, 10)
+    assert stage is None
+    assert [amb.name for amb in ambiguous] == ['A', 'A copy']
+
+
+def test_lengths_within_tolerance_of_each_other_are_ambiguous():
+    stages = index((1000.0, 10, 'A', 'a'), (1000.005, 20, 'B', 'b'))
+    assert stages.lookup(1000.002, 10)[0].name == 'A'
+    assert [amb.name for amb in stages.lookup(1000.002, 30)[1]] == ['A', 'B']
+
+
+def test_start_position_tolerance():
+    stages = index((1000.0, 10, 'A', 'a'), (1000.0, 50, 'B', 'b'), pos_tolerance=5)
+    assert stages.lookup(1000.0, 13)[0].name == 'A'
+    assert stages.lookup(1000.0, 46)[0].name == 'B'
+    assert stages.lookup(1000.0, 30)[0] is None
+
+
+def test_read_stages_csv(tmp_path):
+    stages_csv = tmp_path / 'stages.csv'
+    stages_csv.write_text('length,pos_start,name,folder\n1000.0,,A,a\n\n2000.0,5,B,b\n')
+    stages = StageIndex()
+    stages.read(str(stages_csv))
+    assert len(stages) == 2
+    assert stages.lookup(1000.0, 0)[0].pos_start is None
+    assert stages.lookup(2000.0, 5)[0].folder == 'b'
+
+
+def test_malformed_rows_skipped(tmp_path):
+    stages_csv = tmp_path / 'stages.csv'
+    stages_csv.write_text('length,pos_start,name,folder\n1000.0,0,A,a\n2000.0,B\nlong,0,C,c\n3000.0,0,D,d\n')
+    stages = StageIndex()
+    stages.read(str(stages_csv))
+    assert [stage.name for stage in stages.entries] == ['A', 'D']
+    assert stages.skipped == [3, 4]
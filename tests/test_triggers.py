@@ -0,0 +1,45 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+
+from triggers import TimedSchedule
+
+
+def schedule(delay, notes=None):
+    timed = TimedSchedule(lambda pace: 1.0, lead=1.0)
+    timed.compile(notes or {500: 'crest'}, delay)
+    return timed
+
+
+def test_note_called_lead_time_and_duration_before_it():
+    timed = schedule(0)
+    assert timed.advance(470, 10.0) == []  # Call would start in a second.
+    assert timed.advance(480, 10.0) == [('crest', 0.0)]
+
+
+def test_delay_calls_notes_earlier_in_time_mode():
+    assert schedule(0).advance(380, 10.0) == []
+    assert schedule(100).advance(380, 10.0) == [('crest', 0.0)]
+    assert schedule(100).advance(375, 10.0, horizon=0.5) == [('crest', 0.5)]
+
+
+def test_delay_halved_for_notes_close_to_the_start():
+    timed = schedule(100, {120: 'left 3'})
+    assert timed.dists == [60]
+    assert timed.advance(30, 0.0) == []
+    assert timed.advance(60, 0.0) == [('left 3', 0.0)]
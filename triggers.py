@@ -0,0 +1,158 @@
+#
+# DiRTy Pacenotes
+#
+# Copyright [2017 - 2019] [Palo Samo]
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import math
+from bisect import bisect_right
+
+
+# Distance at which a pacenote is called for given delay.
+def trigger_distance(dist, delay):
+    if dist - delay >= delay:
+        return dist - delay
+    return math.ceil(dist / 2)  # Pacenotes close to the start line.
+
+
+# Sorted trigger distances with a moving cursor.
+class TriggerSchedule:
+    def __init__(self):
+        self.dists = []
+        self.notes = []
+        self.cursor = 0  # Index of the first trigger after last distance.
+
+    def __len__(self):
+        return len(self.dists)
+
+    # Compile schedule once per stage load or delay change.
+    def compile(self, dic_pacenotes, delay):
+        entries = sorted((trigger_distance(dist, delay), dist, pace) for dist, pace in dic_pacenotes.items())
+        self.dists = [entry[0] for entry in entries]
+        self.notes = [entry[2] for entry in entries]
+        self.cursor = 0
+
+    # Move cursor after given distance.
+    def seek(self, dist):
+        self.cursor = bisect_right(self.dists, dist)
+
+    # Return pacenotes crossed in the interval (last_dist, curr_dist].
+    def advance(self, curr_dist):
+        start = end = self.cursor
+        dists = self.dists
+        while end < len(dists) and dists[end] <= curr_dist:
+            end += 1
+        if end == start:
+            return ()
+        self.cursor = end
+        return self.notes[start:end]
+
+    # Move cursor back, return number of triggers crossed in the wrong way.
+    def rewind(self, curr_dist):
+        cursor = bisect_right(self.dists, curr_dist)
+        crossed = self.cursor - cursor
+        self.cursor = cursor
+        return crossed
+
+
+# Notes called a set time before their trigger distance at the current speed.
+class TimedSchedule:
+    def __init__(self, duration, lead=1.0, latency=lambda: 0.0):
+        self.duration = duration  # duration(pace) of the rendered phrase in seconds.
+        self.lead = lead  # Seconds between the end of a call and its note.
+        self.latency = latency  # latency() of the audio output in seconds.
+        self.dists = []  # Trigger distances, delay meters before the notes like TriggerSchedule.
+        self.notes = []
+        self.fired = []  # Distance at which every called note was started.
+        self.cursor = 0  # Index of the first note not called yet.
+
+    def __len__(self):
+        return len(self.dists)
+
+    # Compile schedule once per stage load or delay change, the lead time is added to the delay.
+    def compile(self, dic_pacenotes, delay=0):
+        entries = sorted((trigger_distance(dist, delay), dist, pace) for dist, pace in dic_pacenotes.items())
+        self.dists = [entry[0] for entry in entries]
+        self.notes = [entry[2] for entry in entries]
+        self.fired = list(self.dists)
+        self.cursor = 0
+
+    # Move cursor after given distance.
+    def seek(self, dist):
+        self.cursor = bisect_right(self.dists, dist)
+
+    # Return [(pacenote, wait)] to start within horizon seconds, wait in seconds from now.
+    def advance(self, curr_dist, speed, horizon=0.0):
+        calls = []
+        latency = self.latency()
+        while self.cursor < len(self.dists):
+            dist = self.dists[self.cursor]
+            note = self.notes[self.cursor]
+            if speed > 0:
+                wait = (dist - curr_dist) / speed - self.duration(note) - latency - self.lead
+            else:
+                wait = 0.0 if curr_dist >= dist else math.inf
+            if wait > horizon:
+                break  # Notes are called in order, later ones wait for this one.
+            wait = max(0.0, wait)
+            calls.append((note, wait))
+            self.fired[self.cursor] = curr_dist + speed * wait
+            self.cursor += 1
+        return calls
+
+    # Move cursor back, return number of calls started beyond curr_dist.
+    def rewind(self, curr_dist):
+        cursor = self.cursor
+        while cursor and self.fired[cursor - 1] > curr_dist:
+            cursor -= 1
+        crossed = self.cursor - cursor
+        self.cursor = cursor
+        return crossed
+
+
+# Highlighted pacenote of the editor, moved only when a trigger is crossed.
+class HighlightCursor:
+    def __init__(self):
+        self.dists = []
+        self.keys = []
+        self.current = -1  # Index of the highlighted pacenote, -1 for none.
+
+    # Compile from pacenote distances whenever they or the delay change, keeps the highlight.
+    def compile(self, keys, delay):
+        key = self.key()
+        entries = sorted((trigger_distance(int(key), delay), key) for key in keys)
+        self.dists = [entry[0] for entry in entries]
+        self.keys = [entry[1] for entry in entries]
+        self.current = self.keys.index(key) if key in self.keys else -1
+
+    def key(self):
+        return self.keys[self.current] if self.current >= 0 else None
+
+    # Move to curr_dist, return (old_key, new_key, index) if the highlight changed, else None.
+    def update(self, curr_dist):
+        old = self.current
+        if curr_dist == 0:  # At the start line.
+            self.current = -1
+        else:
+            current = old
+            dists = self.dists
+            while current + 1 < len(dists) and dists[current + 1] <= curr_dist:
+                current += 1
+            if current == old and current >= 0 and dists[current] > curr_dist:  # Going the wrong way.
+                current = bisect_right(dists, curr_dist) - 1
+            self.current = current
+        if self.current == old:
+            return None
+        return (self.keys[old] if old >= 0 else None), self.key(), self.current